@@ -49,9 +49,213 @@ Advanced features:
 3. **Rate limit headers** (X-RateLimit-Remaining, etc.)
 """
 
-from collections import defaultdict, Counter, deque
+from collections import defaultdict, Counter, OrderedDict, deque
 from datetime import datetime
+import json
+import math
+import multiprocessing
+import random
+import sys
+import time
+
+from state_store import RemoteStateStore, StateStore, TokenLeaseCache, run_server
+
+
+class WindowCounter:
+    """
+    Sliding-window-counter approximation of the request count over the last
+    `window` seconds: the previous fixed bucket's count, weighted by how much
+    of it still overlaps the window, plus the current bucket's count.
+    Three ints per window regardless of traffic, instead of a deque of timestamps.
+    """
+    __slots__ = ("window", "bucket", "current", "previous")
+
+    def __init__(self, window: int):
+        self.window = window
+        self.bucket = 0
+        self.current = 0
+        self.previous = 0
+
+    def hit(self, timestamp: int) -> float:
+        """Counts a request at `timestamp` and returns the estimated count in the window."""
+        bucket = timestamp // self.window
+        if bucket > self.bucket:
+            self.previous = self.current if bucket == self.bucket + 1 else 0
+            self.current = 0
+            self.bucket = bucket
+        self.current += 1
+        overlap = (self.window - timestamp % self.window) / self.window
+        return self.previous * overlap + self.current
+
+
+class GCRAState:
+    """
+    Generic cell rate algorithm: `limit` requests per `window` seconds become
+    one request every window / limit seconds, with bursts of up to `limit`.
+    The only state is the theoretical arrival time (TAT) of the next request.
+    """
+    __slots__ = ("tat",)
+
+    def __init__(self):
+        self.tat = 0.0
+
+    @staticmethod
+    def conforms(tat: float, timestamp: int, limit: int, window: int) -> bool:
+        interval = window / limit
+        return max(tat, timestamp) - timestamp <= window - interval
+
+    @staticmethod
+    def remaining(tat: float, timestamp: int, limit: int, window: int) -> int:
+        interval = window / limit
+        return max(0, limit - math.ceil((max(tat, timestamp) - timestamp) / interval))
+
+    def advance(self, timestamp: int, limit: int, window: int) -> None:
+        self.tat = max(self.tat, timestamp) + window / limit
+
+
+class PrincipalState:
+    """
+    Fixed-window counters for every tier of one principal (an API key, a key's
+    endpoint, or an IP), in one record. Buckets are integer ids
+    (timestamp // tier_seconds), so rolling a window is an int compare.
+    """
+    __slots__ = ("limits", "buckets", "counts")
+
+    def __init__(self, limits: tuple):
+        self.limits = limits
+        self.buckets = [0] * len(limits)
+        self.counts = [0] * len(limits)
+
+
+class HierarchicalRateLimiter:
+    """
+    Checks per-key, per-endpoint and per-IP limits across second/minute/hour
+    tiers in a single pass over the principals' state records.
+
+    `limits` is keyed by api_key, as in the Question 10 input, and may also
+    carry "requests_per_second" and an "endpoints" map of per-endpoint limits.
+    `ip_limits` is keyed by IP, with "default" applying to unlisted IPs.
+    A request is allowed only if every tier of every principal has room, and
+    only allowed requests are counted.
+
+    Records are kept in last-touched order. Once the oldest record's
+    coarsest-tier bucket has passed, all of its counters would reset anyway, so
+    it is dropped, and stale principals never accumulate.
+
+    With a `store` (see state_store.py), counters live in the store, so the
+    limits hold across worker processes. Each request charges one atomic
+    `take` over all of its counters, through a TokenLeaseCache of `lease_size`.
+    """
+    TIERS = (("second", 1), ("minute", 60), ("hour", 3600))
+
+    def __init__(self, limits: dict, ip_limits: dict = None, store: StateStore = None, lease_size: int = 32):
+        self.limits = limits
+        self.ip_limits = ip_limits or {}
+        self.tier_seconds = tuple(seconds for _, seconds in self.TIERS)
+        self._states = OrderedDict()
+        self.leases = TokenLeaseCache(store, lease_size) if store is not None else None
+
+    def _tier_limits(self, config: dict) -> tuple:
+        if not config:
+            return (None,) * len(self.TIERS)
+        return tuple(config.get(f"requests_per_{name}") for name, _ in self.TIERS)
+
+    def _state(self, principal: tuple, config: dict) -> PrincipalState:
+        state = self._states.get(principal)
+        if state is None:
+            state = self._states[principal] = PrincipalState(self._tier_limits(config))
+        else:
+            self._states.move_to_end(principal)
+        return state
+
+    def _evict_stale(self, coarsest_bucket: int) -> None:
+        while self._states:
+            state = next(iter(self._states.values()))
+            if state.buckets[-1] >= coarsest_bucket:
+                break
+            self._states.popitem(last=False)
+
+    def _principals(self, api_key: str, endpoint: str, ip: str) -> tuple:
+        key_limits = self.limits.get(api_key, {})
+        return (
+            (("key", api_key), key_limits),
+            (("endpoint", api_key, endpoint), key_limits.get("endpoints", {}).get(endpoint)),
+            (("ip", ip), self.ip_limits.get(ip, self.ip_limits.get("default")))
+        )
+
+    def counters(self, api_key: str, endpoint: str, ip: str, timestamp: int) -> list:
+        """The [key, limit, expire_at] store counters a request is charged to, one per limited tier."""
+        counters = []
+        for principal, config in self._principals(api_key, endpoint, ip):
+            prefix = ":".join(principal)
+            for (name, seconds), tier_limit in zip(self.TIERS, self._tier_limits(config)):
+                if tier_limit is not None:
+                    bucket = timestamp // seconds
+                    counters.append([f"{prefix}:{name}:{bucket}", tier_limit, (bucket + 1) * seconds])
+        return counters
+
+    def _check_shared(self, api_key: str, endpoint: str, ip: str, timestamp: int) -> dict:
+        counters = self.counters(api_key, endpoint, ip, timestamp)
+        tightest = min(counters, key=lambda counter: counter[1]) if counters else [None, None, None]
+        allowed, remaining = self.leases.acquire(counters, timestamp)
+        return {
+            "decision": "ALLOW" if allowed else "DENY",
+            "X-RateLimit-Limit": tightest[1],
+            "X-RateLimit-Remaining": remaining,
+            "X-RateLimit-Reset": tightest[2]
+        }
+
+    def check(self, api_key: str, endpoint: str, ip: str, timestamp: int) -> dict:
+        """Returns the decision with X-RateLimit-Limit/Remaining/Reset for the tightest tier."""
+        if self.leases is not None:
+            return self._check_shared(api_key, endpoint, ip, timestamp)
+        bucket_ids = [timestamp // seconds for seconds in self.tier_seconds]
+        self._evict_stale(bucket_ids[-1])
+        states = [self._state(principal, config) for principal, config in self._principals(api_key, endpoint, ip)]
+
+        allowed = True
+        remaining = None
+        limit = None
+        reset = None
+        for state in states:
+            for tier, bucket in enumerate(bucket_ids):
+                if bucket > state.buckets[tier]:
+                    state.buckets[tier] = bucket
+                    state.counts[tier] = 0
+                tier_limit = state.limits[tier]
+                if tier_limit is None:
+                    continue
+                left = tier_limit - state.counts[tier]
+                if left <= 0:
+                    allowed = False
+                if remaining is None or left < remaining:
+                    remaining = left
+                    limit = tier_limit
+                    reset = (bucket + 1) * self.tier_seconds[tier]
+
+        if allowed:
+            for state in states:
+                for tier, tier_limit in enumerate(state.limits):
+                    if tier_limit is not None:
+                        state.counts[tier] += 1
+            if remaining is not None:
+                remaining -= 1
+        return {
+            "decision": "ALLOW" if allowed else "DENY",
+            "X-RateLimit-Limit": limit,
+            "X-RateLimit-Remaining": None if remaining is None else max(0, remaining),
+            "X-RateLimit-Reset": reset
+        }
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+
 class RateLimiter:
+    WINDOW_MODES = ("exact", "counter", "gcra")
+
+    def __init__(self):
+        self.window_state = {}  # composite key -> per-mode window state from the last run
       
     def track_requests(self, data: dict) -> dict:
         key_request_mappings = defaultdict(list)
@@ -73,7 +277,7 @@ class RateLimiter:
             minute_request_mapping[minute_key] +=1
             hour_mapping[hour_key] +=1
             
-            decision_key= f"{api_key}:{request["timestamp"]}:{i}"
+            decision_key= f"{api_key}:{request['timestamp']}:{i}"
             
             if minute_request_mapping[minute_key]> limits["requests_per_minute"]:
                 decision_mapping[decision_key] ="DENY"
@@ -84,10 +288,23 @@ class RateLimiter:
       
         return {"decision_mapping": decision_mapping, "key_request_mappings":key_request_mappings}  
 
-    def track_requests_sliding_window(self, data: dict) -> dict:
+    def track_requests_sliding_window(self, data: dict, mode: str = "exact") -> dict:
+        """
+        Sliding minute/hour windows per `api_key:endpoint:ip`.
+
+        mode="exact" keeps a deque of every timestamp in the window.
+        mode="counter" keeps two WindowCounters per key (weighted previous +
+        current bucket); every request is counted, as with the deques.
+        mode="gcra" keeps one GCRAState per window; only allowed requests
+        consume capacity.
+        The counter and GCRA modes hold O(1) state per key.
+        """
+        if mode not in self.WINDOW_MODES:
+            raise ValueError(f"Unknown window mode: {mode}")
         key_request_mappings = defaultdict(list)
         minute_request_mapping = defaultdict(deque)
         hour_mapping = defaultdict(deque)
+        window_state = {}
         decision_mapping = {}
         requests = data["requests"]
         for i,request in enumerate(requests):
@@ -100,77 +317,251 @@ class RateLimiter:
             req_per_min = limits.get("requests_per_minute", 100)
             req_per_hour = limits.get("requests_per_hour", 1000)
             composite_key = f"{api_key}:{endpoint}:{ip}"
-            window_minute = minute_request_mapping[composite_key]
             key_request_mappings[api_key].append(request)
-            while window_minute and timestamp - window_minute[0] >= 60:
-                window_minute.popleft()
-            window_minute.append(timestamp) 
-            window_hour = hour_mapping[composite_key]
-            
-            while window_hour and timestamp - window_hour[0] >= 3600:
-                window_hour.popleft()
-            window_hour.append(timestamp)
-                
-            
             decision_key= f"{api_key}:{endpoint}:{ip}:{timestamp}:{i}"
-            decision ="ALLOW"
-            if len(window_minute) > limits["requests_per_minute"]:
-                decision ="DENY"
-            elif len(window_hour) > limits["requests_per_hour"]:
-                decision ="DENY"
+
+            if mode == "counter":
+                counters = window_state.get(composite_key)
+                if counters is None:
+                    counters = window_state[composite_key] = (WindowCounter(60), WindowCounter(3600))
+                count_minute = counters[0].hit(timestamp)
+                count_hour = counters[1].hit(timestamp)
+                decision = "DENY" if count_minute > req_per_min or count_hour > req_per_hour else "ALLOW"
+                remaining_minute = max(0, req_per_min - math.ceil(count_minute))
+                remaining_hour = max(0, req_per_hour - math.ceil(count_hour))
+            elif mode == "gcra":
+                cells = window_state.get(composite_key)
+                if cells is None:
+                    cells = window_state[composite_key] = (GCRAState(), GCRAState())
+                decision = "DENY"
+                if (GCRAState.conforms(cells[0].tat, timestamp, req_per_min, 60)
+                        and GCRAState.conforms(cells[1].tat, timestamp, req_per_hour, 3600)):
+                    cells[0].advance(timestamp, req_per_min, 60)
+                    cells[1].advance(timestamp, req_per_hour, 3600)
+                    decision = "ALLOW"
+                remaining_minute = GCRAState.remaining(cells[0].tat, timestamp, req_per_min, 60)
+                remaining_hour = GCRAState.remaining(cells[1].tat, timestamp, req_per_hour, 3600)
             else:
-                decision ="ALLOW"        
-            remaining_minute = max(0, req_per_min - len(window_minute))
-            remaining_hour = max(0, req_per_hour - len(window_hour))
+                window_minute = minute_request_mapping[composite_key]
+                while window_minute and timestamp - window_minute[0] >= 60:
+                    window_minute.popleft()
+                window_minute.append(timestamp) 
+                window_hour = hour_mapping[composite_key]
+                
+                while window_hour and timestamp - window_hour[0] >= 3600:
+                    window_hour.popleft()
+                window_hour.append(timestamp)
+                window_state[composite_key] = (window_minute, window_hour)
+
+                decision ="ALLOW"
+                if len(window_minute) > req_per_min:
+                    decision ="DENY"
+                elif len(window_hour) > req_per_hour:
+                    decision ="DENY"
+                else:
+                    decision ="ALLOW"        
+                remaining_minute = max(0, req_per_min - len(window_minute))
+                remaining_hour = max(0, req_per_hour - len(window_hour))
             decision_mapping[decision_key] = {
                 "decision": decision,
                 "X-RateLimit-Remaining-Minute": remaining_minute,
                 "X-RateLimit-Remaining-Hour": remaining_hour
             }
+        self.window_state = window_state
         return {"decision_mapping": decision_mapping, "key_request_mappings":key_request_mappings}  
 
-data= {
-    "requests": [
-        # These two are in the SAME minute and hour
-        {
-            "api_key": "sk_test_123",
-            "endpoint": "/v1/charges",
-            "timestamp": 1640995200,  # 2022-01-01 00:00:00 UTC
-            "ip": "192.168.1.1"
-        },
-        {
-            "api_key": "sk_test_123",
-            "endpoint": "/v1/charges",
-            "timestamp": 1640995205,  # 2022-01-01 00:00:05 UTC (same minute)
-            "ip": "192.168.1.1"
-        },
-        # Next request is in a DIFFERENT minute but SAME hour
-        {
-            "api_key": "sk_test_123",
-            "endpoint": "/v1/customers",
-            "timestamp": 1640995265,  # 2022-01-01 00:01:05 UTC
-            "ip": "192.168.1.2"
-        },
-        # Different hour entirely
-        {
-            "api_key": "sk_test_456",
-            "endpoint": "/v1/charges",
-            "timestamp": 1640998800,  # 2022-01-01 01:00:00 UTC
-            "ip": "192.168.1.3"
-        }
-    ],
-    "limits": {
-        "sk_test_123": {
-            "requests_per_minute": 2,
-            "requests_per_hour": 3
+
+    def track_requests_hierarchical(self, data: dict) -> dict:
+        """Per-key, per-endpoint and per-IP limits over second/minute/hour tiers; see HierarchicalRateLimiter."""
+        limiter = HierarchicalRateLimiter(data["limits"], data.get("ip_limits"))
+        decision_mapping = {}
+        for i, request in enumerate(data["requests"]):
+            api_key = request["api_key"]
+            endpoint = request["endpoint"]
+            ip = request["ip"]
+            timestamp = request["timestamp"]
+            decision_mapping[f"{api_key}:{endpoint}:{ip}:{timestamp}:{i}"] = limiter.check(api_key, endpoint, ip, timestamp)
+        return {"decision_mapping": decision_mapping}
+
+
+def generate_api_traffic(n_requests: int, n_keys: int = 50, seed: int = 7) -> dict:
+    """Synthetic traffic in the Question 10 input format: steady callers plus a few bursty ones."""
+    rng = random.Random(seed)
+    endpoints = ["/v1/charges", "/v1/customers", "/v1/refunds"]
+    keys = [f"sk_test_{i}" for i in range(n_keys)]
+    limits = {key: {"requests_per_minute": 100, "requests_per_hour": 1000} for key in keys}
+    timestamp = 1640995200
+    requests = []
+    for _ in range(n_requests):
+        timestamp += rng.choice((0, 0, 0, 1))
+        # A handful of keys send most of the traffic, in bursts
+        key = keys[min(int(rng.expovariate(0.5)), n_keys - 1)]
+        requests.append({
+            "api_key": key,
+            "endpoint": endpoints[rng.randrange(len(endpoints))] if rng.random() < 0.2 else endpoints[0],
+            "timestamp": timestamp,
+            "ip": f"10.0.0.{rng.randrange(4)}"
+        })
+    return {"requests": requests, "limits": limits}
+
+
+def _state_bytes(obj) -> int:
+    """Approximate deep size of window state built from tuples, deques, slotted objects and ints."""
+    total = sys.getsizeof(obj)
+    if isinstance(obj, (tuple, list, deque)):
+        total += sum(_state_bytes(item) for item in obj)
+    elif hasattr(obj, "__slots__"):
+        total += sum(sys.getsizeof(getattr(obj, slot)) for slot in obj.__slots__)
+    return total
+
+
+def benchmark_window_modes(data: dict) -> None:
+    """
+    Replays `data` through every window mode, reporting how often the
+    approximate modes agree with the exact deque decisions and how much
+    window state each keeps.
+    """
+    limiter = RateLimiter()
+    results = {}
+    print(f"{'mode':>8} {'seconds':>8} {'state KiB':>10} {'B/key':>8} {'agree':>8} {'allowed':>8}")
+    for mode in RateLimiter.WINDOW_MODES:
+        start = time.perf_counter()
+        decisions = limiter.track_requests_sliding_window(data, mode)["decision_mapping"]
+        elapsed = time.perf_counter() - start
+        state = sum(_state_bytes(value) for value in limiter.window_state.values())
+        results[mode] = [entry["decision"] for entry in decisions.values()]
+        agree = sum(a == b for a, b in zip(results[mode], results["exact"])) / len(results[mode])
+        allowed = results[mode].count("ALLOW")
+        print(f"{mode:>8} {elapsed:>8.3f} {state / 1024:>10.1f} {state / len(limiter.window_state):>8.0f} "
+              f"{agree:>8.2%} {allowed:>8}")
+
+
+def _shared_store_worker(port: int, data: dict, shard: list, lease_size: int, barrier, results) -> None:
+    store = RemoteStateStore(port=port)
+    limiter = HierarchicalRateLimiter(data["limits"], data.get("ip_limits"), store, lease_size)
+    requests = data["requests"]
+    barrier.wait()
+    start = time.perf_counter()
+    allowed = []
+    for i in shard:
+        request = requests[i]
+        if limiter.check(request["api_key"], request["endpoint"], request["ip"], request["timestamp"])["decision"] == "ALLOW":
+            allowed.append(i)
+    results.put((start, time.perf_counter(), store.round_trips, allowed))
+    store.close()
+
+
+def benchmark_shared_store(data: dict, worker_counts=(1, 4, 16), lease_sizes=(1, 32)) -> None:
+    """
+    Requests/sec of HierarchicalRateLimiter on a shared StateServer, with the
+    traffic split round-robin over N worker processes. Each run gets a fresh
+    server. It reports store round trips, limit violations (counters whose
+    allowed total across all workers exceeds the limit; should be 0) and
+    admissions relative to a single-process in-memory run.
+    """
+    requests = data["requests"]
+    local = HierarchicalRateLimiter(data["limits"], data.get("ip_limits"))
+    exact_allowed = sum(local.check(r["api_key"], r["endpoint"], r["ip"], r["timestamp"])["decision"] == "ALLOW"
+                        for r in requests)
+
+    print(f"{'workers':>8} {'lease':>6} {'req/s':>9} {'trips':>8} {'violations':>10} {'admitted':>9}")
+    for lease_size in lease_sizes:
+        for workers in worker_counts:
+            port_queue = multiprocessing.Queue()
+            server = multiprocessing.Process(target=run_server, args=("127.0.0.1", 0, port_queue), daemon=True)
+            server.start()
+            port = port_queue.get()
+
+            barrier = multiprocessing.Barrier(workers)
+            results = multiprocessing.Queue()
+            processes = [multiprocessing.Process(target=_shared_store_worker,
+                                                 args=(port, data, list(range(w, len(requests), workers)),
+                                                       lease_size, barrier, results))
+                         for w in range(workers)]
+            for process in processes:
+                process.start()
+            outcomes = [results.get() for _ in processes]
+            for process in processes:
+                process.join()
+            server.terminate()
+            server.join()
+
+            elapsed = max(end for _, end, _, _ in outcomes) - min(start for start, _, _, _ in outcomes)
+            charged = Counter()
+            limits = {}
+            for _, _, _, allowed in outcomes:
+                for i in allowed:
+                    r = requests[i]
+                    for key, limit, _ in local.counters(r["api_key"], r["endpoint"], r["ip"], r["timestamp"]):
+                        charged[key] += 1
+                        limits[key] = limit
+            violations = sum(count > limits[key] for key, count in charged.items())
+            admitted = sum(len(allowed) for _, _, _, allowed in outcomes)
+            print(f"{workers:>8} {lease_size:>6} {len(requests) / elapsed:>9.0f} "
+                  f"{sum(trips for _, _, trips, _ in outcomes):>8} {violations:>10} {admitted / exact_allowed:>9.2%}")
+
+
+if __name__ == "__main__":
+    # Guarded so worker processes started with spawn/forkserver can import this module without side effects
+    data= {
+        "requests": [
+            # These two are in the SAME minute and hour
+            {
+                "api_key": "sk_test_123",
+                "endpoint": "/v1/charges",
+                "timestamp": 1640995200,  # 2022-01-01 00:00:00 UTC
+                "ip": "192.168.1.1"
+            },
+            {
+                "api_key": "sk_test_123",
+                "endpoint": "/v1/charges",
+                "timestamp": 1640995205,  # 2022-01-01 00:00:05 UTC (same minute)
+                "ip": "192.168.1.1"
+            },
+            # Next request is in a DIFFERENT minute but SAME hour
+            {
+                "api_key": "sk_test_123",
+                "endpoint": "/v1/customers",
+                "timestamp": 1640995265,  # 2022-01-01 00:01:05 UTC
+                "ip": "192.168.1.2"
+            },
+            # Different hour entirely
+            {
+                "api_key": "sk_test_456",
+                "endpoint": "/v1/charges",
+                "timestamp": 1640998800,  # 2022-01-01 01:00:00 UTC
+                "ip": "192.168.1.3"
+            }
+        ],
+        "limits": {
+            "sk_test_123": {
+                "requests_per_minute": 2,
+                "requests_per_hour": 3
+            },
+            "sk_test_456": {
+                "requests_per_minute": 1,
+                "requests_per_hour": 5
+            }
         },
-        "sk_test_456": {
-            "requests_per_minute": 1,
-            "requests_per_hour": 5
+        # Used by track_requests_hierarchical only
+        "ip_limits": {
+            "default": {"requests_per_second": 5, "requests_per_minute": 100}
         }
-    }
-}        
-rate_limiter = RateLimiter()
-#print(rate_limiter.track_requests(data))
-print(rate_limiter.track_requests_sliding_window(data))
+    }        
+    rate_limiter = RateLimiter()
+    #print(rate_limiter.track_requests(data))
+    print(rate_limiter.track_requests_sliding_window(data))
+    data["limits"]["sk_test_123"]["endpoints"] = {"/v1/charges": {"requests_per_second": 1}}
+    print(rate_limiter.track_requests_hierarchical(data))
+
+    if "--benchmark" in sys.argv:
+        # Optional path to recorded traffic in the input format above
+        args = sys.argv[sys.argv.index("--benchmark") + 1:]
+        if args:
+            with open(args[0]) as f:
+                benchmark_window_modes(json.load(f))
+        else:
+            benchmark_window_modes(generate_api_traffic(200_000))
 
+    if "--shared-benchmark" in sys.argv:
+        benchmark_shared_store(generate_api_traffic(100_000))
@@ -0,0 +1,273 @@
+"""
+Shared limiter state for rate limiters running in several processes.
+
+The limiters in question_10.py (`HierarchicalRateLimiter`) and q8.py
+(`LeakyBucketLimiter`) keep their state in process-local dicts. With N API
+workers, each one enforces its own copy of the limit, so a client can get N
+times its allowance. Given a `store`, they keep that state here instead:
+
+- `StateTable` holds the state and implements the atomic operations:
+  `take` (check-and-increment of several fixed-window counters at once),
+  `release` (hand back unused leased tokens) and `leak` (one leaky-bucket
+  decision). Entries carry an expiry and are swept
+  in amortized O(1).
+- `InProcessStateStore` wraps a table in the same process.
+- `StateServer` serves a table over TCP with asyncio. It stands in for Redis:
+  a single-threaded server runs each command to completion, so commands are
+  atomic without locks, the way Lua scripts are in Redis.
+- `RemoteStateStore` is the blocking client. `execute` pipelines a batch of
+  commands in one round trip.
+- `TokenLeaseCache` leases counter tokens in batches. Most requests are
+  decided locally, and the limit is never exceeded because every lease is
+  reserved on the server first.
+
+The wire format is one JSON array of commands per line, answered by one JSON
+array of results per line.
+
+    python state_store.py --serve [port]
+"""
+import asyncio
+import heapq
+import json
+import socket
+import sys
+
+
+class StateTable:
+    """
+    Entries are swept `expiry_grace` seconds after they expire. Callers pass
+    their own `now`, and workers' clocks (or replayed log times) drift apart,
+    so a worker that is behind must not find its live window swept.
+    """
+
+    def __init__(self, expiry_grace: float = 3600):
+        self.expiry_grace = expiry_grace
+        self._entries = {}  # key -> [count, expire_at] or [level, last_update, expire_at]
+        self._sweep_at = 1024
+        self.commands = 0
+
+    def execute(self, commands: list) -> list:
+        """Runs a pipeline of [op, *args] commands in order and returns their results."""
+        handlers = {"take": self.take, "release": self.release, "leak": self.leak}
+        results = []
+        for op, *args in commands:
+            handler = handlers.get(op)
+            if handler is None:
+                raise ValueError(f"Unknown command: {op}")
+            results.append(handler(*args))
+        self.commands += len(commands)
+        return results
+
+    def take(self, counters: list, amount: int, now: float) -> list:
+        """
+        Grants up to `amount` from every [key, limit, expire_at] counter at once:
+        the grant is the smallest headroom, and each counter is charged the
+        same grant. Returns [granted, remaining], where remaining is the
+        smallest headroom left.
+        """
+        entries = self._entries
+        live = []
+        granted = amount
+        for key, limit, expire_at in counters:
+            entry = entries.get(key)
+            if entry is None or entry[1] <= now:
+                entry = entries[key] = [0, expire_at]
+            live.append(entry)
+            granted = min(granted, limit - entry[0])
+        granted = max(0, granted)
+
+        remaining = None
+        for entry, (_, limit, _) in zip(live, counters):
+            entry[0] += granted
+            if remaining is None or limit - entry[0] < remaining:
+                remaining = limit - entry[0]
+        self._maybe_sweep(now)
+        return [granted, remaining]
+
+    def release(self, keys: list, amount: int, now: float) -> None:
+        """Returns `amount` unused leased tokens to every counter that is still live."""
+        for key in keys:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > now:
+                entry[0] = max(0, entry[0] - amount)
+
+    def leak(self, key: str, size: float, now: float, capacity: float, rate: float) -> bool:
+        """Leaky-bucket decision with the same arithmetic as q8's LeakyBucketLimiter.check."""
+        entry = self._entries.get(key)
+        if entry is None or len(entry) != 3:
+            entry = self._entries[key] = [0.0, now, now]
+        else:
+            elapsed = now - entry[1]
+            if elapsed > 0:
+                entry[0] = max(0.0, entry[0] - elapsed * rate)
+                entry[1] = now
+
+        accepted = entry[0] + size <= capacity
+        if accepted:
+            entry[0] += size
+        # A drained bucket is the same as a missing one
+        entry[2] = entry[1] + entry[0] / rate if rate > 0 else float("inf")
+        self._maybe_sweep(now)
+        return accepted
+
+    def _maybe_sweep(self, now: float) -> None:
+        if len(self._entries) < self._sweep_at:
+            return
+        expired = [key for key, entry in self._entries.items() if entry[-1] + self.expiry_grace <= now]
+        for key in expired:
+            del self._entries[key]
+        self._sweep_at = max(1024, 2 * len(self._entries))
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class StateStore:
+    """Interface shared by the in-process and networked stores."""
+
+    def execute(self, commands: list) -> list:
+        raise NotImplementedError
+
+    def take(self, counters: list, amount: int, now: float) -> list:
+        return self.execute([["take", counters, amount, now]])[0]
+
+    def leak(self, key: str, size: float, now: float, capacity: float, rate: float) -> bool:
+        return self.execute([["leak", key, size, now, capacity, rate]])[0]
+
+
+class InProcessStateStore(StateStore):
+    def __init__(self, table: StateTable = None):
+        self.table = table if table is not None else StateTable()
+
+    def execute(self, commands: list) -> list:
+        return self.table.execute(commands)
+
+
+class RemoteStateStore(StateStore):
+    """Blocking client for StateServer; one connection per worker process."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 6390):
+        self.host = host
+        self.port = port
+        self._sock = socket.create_connection((host, port))
+        self._sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._reader = self._sock.makefile("rb")
+        self.round_trips = 0
+
+    def execute(self, commands: list) -> list:
+        self._sock.sendall(json.dumps(commands).encode() + b"\n")
+        line = self._reader.readline()
+        if not line:
+            raise ConnectionError(f"State server {self.host}:{self.port} closed the connection")
+        self.round_trips += 1
+        reply = json.loads(line)
+        if isinstance(reply, dict):
+            raise RuntimeError(reply["error"])
+        return reply
+
+    def close(self) -> None:
+        self._reader.close()
+        self._sock.close()
+
+
+class StateServer:
+    def __init__(self, table: StateTable = None):
+        self.table = table if table is not None else StateTable()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while line := await reader.readline():
+                try:
+                    reply = self.table.execute(json.loads(line))
+                except (ValueError, TypeError) as e:
+                    reply = {"error": str(e)}
+                writer.write(json.dumps(reply).encode() + b"\n")
+                await writer.drain()
+        except ConnectionResetError:
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host: str = "127.0.0.1", port: int = 6390, ready=None) -> None:
+        """Serves until cancelled. `ready`, if given, is called with the bound port."""
+        server = await asyncio.start_server(self._handle, host, port)
+        if ready is not None:
+            ready(server.sockets[0].getsockname()[1])
+        async with server:
+            await server.serve_forever()
+
+
+def run_server(host: str = "127.0.0.1", port: int = 6390, port_queue=None) -> None:
+    """Process entry point; port=0 binds a free port and reports it on `port_queue`."""
+    asyncio.run(StateServer().serve(host, port, port_queue.put if port_queue is not None else None))
+
+
+class TokenLeaseCache:
+    """
+    Local cache of counter tokens leased from a StateStore.
+
+    `acquire` spends a locally leased token when it can, and only goes to the
+    store when the lease for that counter combination runs out. Each window's
+    leases start at one token and double, up to `lease_size`, while the worker
+    keeps using them; near the limit they shrink to a quarter of the remaining
+    headroom. Workers with little traffic for a key therefore hold few of its
+    tokens. When a lease's finest window ends, its unused
+    tokens are released back to the counters that are still live. Those
+    releases ride in the same pipeline as the next `take`. Once the store
+    reports no headroom left, later requests for those counters are denied
+    locally until the lease expires. lease_size=1 disables leasing.
+    """
+
+    def __init__(self, store: StateStore, lease_size: int = 32):
+        self.store = store
+        self.lease_size = lease_size
+        self._leases = {}  # counter keys -> [tokens, remaining, expire_at, last lease size]
+        self._expiring = []  # heap of (expire_at, counter keys)
+
+    def acquire(self, counters: list, now: float) -> tuple:
+        """Returns (allowed, remaining) for one request charged to every counter."""
+        if not counters:
+            return True, None
+        lease_key = tuple(counter[0] for counter in counters)
+        lease = self._leases.get(lease_key)
+        if lease is not None and lease[2] > now:
+            if lease[0] > 0:
+                lease[0] -= 1
+                return True, lease[1] + lease[0]
+            if lease[1] <= 0:
+                return False, 0
+            want = min(self.lease_size, 2 * lease[3], max(1, lease[1] // 4))
+        else:
+            want = 1
+
+        commands = self._expired_releases(now)
+        commands.append(["take", counters, want, now])
+        granted, remaining = self.store.execute(commands)[-1]
+        if lease_key not in self._leases:
+            expire_at = min(counter[2] for counter in counters)
+            heapq.heappush(self._expiring, (expire_at, lease_key))
+            self._leases[lease_key] = lease = [0, 0, expire_at, 0]
+        else:
+            lease = self._leases[lease_key]
+        lease[0] = max(0, granted - 1)
+        lease[1] = remaining
+        lease[3] = want
+        if granted == 0:
+            return False, 0
+        return True, remaining + granted - 1
+
+    def _expired_releases(self, now: float) -> list:
+        """Drops leases whose window has ended; returns release commands for their unused tokens."""
+        commands = []
+        while self._expiring and self._expiring[0][0] <= now:
+            _, lease_key = heapq.heappop(self._expiring)
+            lease = self._leases.pop(lease_key, None)
+            if lease is not None and lease[0] > 0:
+                commands.append(["release", list(lease_key), lease[0], now])
+        return commands
+
+
+if __name__ == "__main__":
+    if "--serve" in sys.argv:
+        args = sys.argv[sys.argv.index("--serve") + 1:]
+        run_server(port=int(args[0]) if args else 6390)
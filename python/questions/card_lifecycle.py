@@ -30,7 +30,17 @@ Part 4: Final Card Ledger Summary
 - Generate a summary for each card, including its final status, limits, and a
   list of settled transactions.
 """
+import bisect
+import heapq
+import os
+import random
+import sys
+import time
+import zlib
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+from result_cache import ResultCache
 
 # ===================================================================================
 # User's Original Approach
@@ -172,79 +182,115 @@ class CardLifeCycle:
 class AuthorizationService:
     """A clean, modular solution for the Card Authorization Service problem."""
 
+    def __init__(self, result_cache: ResultCache = None):
+        # Optional multi-entry cache; without one, only the last log is memoized.
+        self.result_cache = result_cache
+
+    def _parse_line(self, line: str):
+        """Parses a single '&'-separated event line. Returns None if malformed."""
+        try:
+            timestamp, event_type, data_str = line.split(';', 2)
+            data = dict(item.split('=', 1) for item in data_str.split(';') if item)
+        except (ValueError, IndexError):
+            return None
+        return {"timestamp": timestamp, "type": event_type, "data": data}
+
     def _parse_and_sort_log(self, log: str) -> list:
         """Parses the raw log string and sorts all events chronologically."""
         events = []
         for line in log.strip().split('&'):
             if not line:
                 continue
-            try:
-                timestamp, event_type, data_str = line.split(';', 2)
-                data = {k: v for k, v in (item.split('=') for item in data_str.split(';')) if item}
-                events.append({"timestamp": timestamp, "type": event_type, "data": data})
-            except (ValueError, IndexError):
-                continue  # Skip malformed lines
+            event = self._parse_line(line)
+            if event is not None:
+                events.append(event)
         
         return sorted(events, key=lambda e: e["timestamp"])
 
-    def _get_final_system_state(self, log: str) -> dict:
+    def _new_state(self) -> dict:
+        """Returns an empty system state for `_apply_event` to build on."""
+        return {
+            "card_info": defaultdict(lambda: {"status": None, "total_limit": 0, "available_limit": 0}),
+            "auth_results": defaultdict(list),
+            "settled_txs": defaultdict(list),
+            "tx_to_card_map": {}  # Helper to link a settled transaction back to its card
+        }
+
+    def _apply_event(self, state: dict, event: dict):
         """
-        The core processing engine. Iterates through the sorted log once
-        to build a comprehensive final state for the entire system.
+        Applies one event to the state in O(1). For TX_AUTH_REQUEST events the
+        decision ('authorized' or 'declined') is returned.
         """
-        # This check prevents re-computing for the same log string (memoization).
-        if hasattr(self, '_cached_state') and self._cached_log == log:
-            return self._cached_state
-            
-        sorted_events = self._parse_and_sort_log(log)
+        card_info = state["card_info"]
+        event_type = event["type"]
+        data = event["data"]
+        card_id = data.get("card_id")
+
+        if event_type == "CARD_CREATED":
+            limit = int(data.get("limit", 0))
+            card_info[card_id]["total_limit"] = limit
+            card_info[card_id]["available_limit"] = limit
         
-        # --- State Tracking Dictionaries ---
-        card_info = defaultdict(lambda: {"status": None, "total_limit": 0, "available_limit": 0})
-        auth_results = defaultdict(list)
-        settled_txs = defaultdict(list)
-        tx_to_card_map = {} # Helper to link a settled transaction back to its card
-
-        for event in sorted_events:
-            event_type = event["type"]
-            data = event["data"]
-            card_id = data.get("card_id")
-
-            if event_type == "CARD_CREATED":
-                limit = int(data.get("limit", 0))
-                card_info[card_id]["total_limit"] = limit
-                card_info[card_id]["available_limit"] = limit
-            
-            elif event_type == "CARD_STATUS_CHANGED":
-                if card_id in card_info:
-                    card_info[card_id]["status"] = data.get("status")
+        elif event_type == "CARD_STATUS_CHANGED":
+            if card_id in card_info:
+                card_info[card_id]["status"] = data.get("status")
 
-            elif event_type == "TX_AUTH_REQUEST":
-                tx_id = data.get("transaction_id")
-                amount = int(data.get("amount", 0))
-                
-                # Authorization Logic uses the card's state *at this moment in time*
-                if card_id in card_info and card_info[card_id]["status"] == "ACTIVE" and card_info[card_id]["available_limit"] >= amount:
-                    auth_results["authorized"].append(tx_id)
-                    card_info[card_id]["available_limit"] -= amount
-                    tx_to_card_map[tx_id] = card_id
-                else:
-                    auth_results["declined"].append(tx_id)
+        elif event_type == "TX_AUTH_REQUEST":
+            tx_id = data.get("transaction_id")
+            amount = int(data.get("amount", 0))
             
-            elif event_type == "TX_SETTLED":
-                tx_id = data.get("transaction_id")
-                if tx_id in tx_to_card_map:
-                    card_id_for_tx = tx_to_card_map[tx_id]
-                    settled_txs[card_id_for_tx].append(tx_id)
+            # Authorization Logic uses the card's state *at this moment in time*
+            if card_id in card_info and card_info[card_id]["status"] == "ACTIVE" and card_info[card_id]["available_limit"] >= amount:
+                state["auth_results"]["authorized"].append(tx_id)
+                card_info[card_id]["available_limit"] -= amount
+                state["tx_to_card_map"][tx_id] = card_id
+                return "authorized"
+            state["auth_results"]["declined"].append(tx_id)
+            return "declined"
+        
+        elif event_type == "TX_SETTLED":
+            tx_id = data.get("transaction_id")
+            if tx_id in state["tx_to_card_map"]:
+                card_id_for_tx = state["tx_to_card_map"][tx_id]
+                state["settled_txs"][card_id_for_tx].append(tx_id)
+        return None
+
+    def _get_final_system_state(self, log: str) -> dict:
+        """Returns the final state for `log`, computing it only on a cache miss."""
+        if self.result_cache is not None:
+            return self.result_cache.get_or_compute(type(self).__name__, log, self._build_state)
+
+        # This check prevents re-computing for the same log string (memoization).
+        if hasattr(self, '_cached_state') and self._cached_log == log:
+            return self._cached_state
 
         # Cache the result for efficiency
         self._cached_log = log
-        self._cached_state = {
-            "card_info": card_info,
-            "auth_results": auth_results,
-            "settled_txs": settled_txs
-        }
+        self._cached_state = self._build_state(log)
         return self._cached_state
 
+    def _build_state(self, log: str) -> dict:
+        """
+        The core processing engine. Iterates through the sorted log once
+        to build a comprehensive final state for the entire system.
+        """
+        state = self._new_state()
+        for event in self._parse_and_sort_log(log):
+            self._apply_event(state, event)
+        return state
+
+    def _summarize(self, state: dict) -> dict:
+        """Formats the Part 4 ledger summary from a system state."""
+        summary = {}
+        for cid, info in state["card_info"].items():
+            summary[cid] = {
+                "status": info["status"],
+                "total_limit": info["total_limit"],
+                "available_limit": info["available_limit"],
+                "settled_txs": sorted(state["settled_txs"].get(cid, []))
+            }
+        return summary
+
     # --- Public Methods For Each Part ---
 
     def track_card_lifecycles(self, log: str) -> dict:
@@ -278,16 +324,391 @@ class AuthorizationService:
     def generate_ledger_summary(self, log: str) -> dict:
         """Solves Part 4."""
         state = self._get_final_system_state(log)
-        summary = {}
-        for cid, info in state["card_info"].items():
-            summary[cid] = {
-                "status": info["status"],
-                "total_limit": info["total_limit"],
-                "available_limit": info["available_limit"],
-                "settled_txs": sorted(state["settled_txs"].get(cid, []))
-            }
-        return summary
-        
+        return self._summarize(state)
+
+
+# ===================================================================================
+# Streaming Solution
+#
+# `AuthorizationService` replays the whole log on every new log string. For
+# real-time authorization the state is instead kept in memory and each event is
+# applied once, as it arrives, through the same `_apply_event` transition. A
+# small reorder buffer (a min-heap keyed by timestamp) absorbs events that
+# arrive slightly out of order.
+# ===================================================================================
+class StreamingAuthorizationService(AuthorizationService):
+    """
+    Incremental authorization engine. `ingest` buffers an event and applies the
+    oldest buffered event once more than `reorder_window` are held, so each
+    event costs O(log reorder_window) instead of a full replay.
+    """
+
+    def __init__(self, reorder_window: int = 64):
+        super().__init__()
+        self.reorder_window = reorder_window
+        self._state = self._new_state()
+        self._buffer = []     # heap of (timestamp, arrival_seq, event)
+        self._seq = 0
+        self._watermark = ""  # timestamp of the newest applied event
+        self.late_events = 0  # events applied after a newer one (beyond the window)
+        # Part 2 decides on status alone, so it keeps its own statuses and results
+        self._simple_statuses = {}
+        self._simple_results = defaultdict(list)
+
+    def _to_event(self, event):
+        if isinstance(event, str):
+            return self._parse_line(event.strip())
+        return event
+
+    def _apply(self, event: dict):
+        if event["timestamp"] < self._watermark:
+            self.late_events += 1
+        else:
+            self._watermark = event["timestamp"]
+        data = event["data"]
+        if event["type"] == "CARD_STATUS_CHANGED":
+            self._simple_statuses[data.get("card_id")] = data.get("status")
+        elif event["type"] == "TX_AUTH_REQUEST":
+            decision = "authorized" if self._simple_statuses.get(data.get("card_id")) == "ACTIVE" else "declined"
+            self._simple_results[decision].append(data.get("transaction_id"))
+        return self._apply_event(self._state, event)
+
+    def ingest(self, event) -> None:
+        """Accepts a raw event line or a parsed event dict."""
+        event = self._to_event(event)
+        if event is None:
+            return  # Skip malformed lines
+        heapq.heappush(self._buffer, (event["timestamp"], self._seq, event))
+        self._seq += 1
+        if len(self._buffer) > self.reorder_window:
+            self._apply(heapq.heappop(self._buffer)[2])
+
+    def flush(self, up_to: str = None) -> None:
+        """Applies buffered events, optionally only those at or before `up_to`."""
+        while self._buffer and (up_to is None or self._buffer[0][0] <= up_to):
+            self._apply(heapq.heappop(self._buffer)[2])
+
+    def authorize(self, tx) -> str:
+        """
+        Decides a TX_AUTH_REQUEST immediately. Buffered events that happened
+        before the request are applied first so the decision sees the card's
+        state at that moment.
+        """
+        tx = self._to_event(tx)
+        if tx is None or tx["type"] != "TX_AUTH_REQUEST":
+            raise ValueError("authorize expects a TX_AUTH_REQUEST event")
+        self.flush(up_to=tx["timestamp"])
+        return self._apply(tx)
+
+    def ingest_log(self, log: str) -> None:
+        """Ingests every event of an '&'-separated log; each event is applied once."""
+        for line in log.strip().split('&'):
+            if line:
+                self.ingest(line)
+
+    def _get_final_system_state(self, log: str = "") -> dict:
+        """
+        Returns the live state after applying everything buffered. `log` is
+        ignored: events only enter through `ingest`/`ingest_log`, so the
+        inherited Part 1-4 methods never apply an event twice.
+        """
+        self.flush()
+        return self._state
+
+    def authorize_transactions_simple(self, log: str = "") -> dict:
+        """Solves Part 2 from the ingested events; `log` is ignored."""
+        self.flush()
+        return dict(self._simple_results)
+
+    def generate_ledger_summary(self, log: str = "") -> dict:
+        """Solves Part 4 from the live state; `log` is ignored."""
+        return self._summarize(self._get_final_system_state())
+
+
+# ===================================================================================
+# Partitioned Solution
+#
+# Cards never affect each other: limits, status and holds are all per card. The
+# events can therefore be hash-sharded by card_id and each shard replayed on its
+# own timeline in a separate process. TX_SETTLED events carry no card_id, so
+# they follow the card of the matching TX_AUTH_REQUEST. Every shard tags its
+# results with the (timestamp, log position) sort key, which lets the merge
+# reproduce the serial output exactly.
+#
+# The parent never parses. Each worker receives the raw log once and routes a
+# contiguous range of its lines to shards with a cheap scan that slices out only
+# the type, card_id and transaction_id fields. The parent joins the routed line
+# positions and sends each settlement to the shard of its request, and each
+# worker then fully parses and replays only its own shard's lines.
+# ===================================================================================
+_partition_lines = None
+
+
+def _init_partition_worker(log: str) -> None:
+    global _partition_lines
+    _partition_lines = log.strip().split('&')
+
+
+def _field(line: str, name: str):
+    """Value of the last `;name=` field, matching the dict parse's last-wins rule."""
+    start = line.rfind(name)
+    if start == -1:
+        return None
+    start += len(name)
+    end = line.find(";", start)
+    return line[start:] if end == -1 else line[start:end]
+
+
+def _route_lines(start: int, stop: int, shards: int, lines: list = None) -> tuple:
+    """
+    Routes lines[start:stop] to card_id shards without parsing them. Returns the
+    line positions of each shard, the shard of every requested transaction_id,
+    and the (position, transaction_id) settlements left for the parent to route.
+    Runs in a worker.
+    """
+    lines = _partition_lines if lines is None else lines
+    positions = [[] for _ in range(shards)]
+    tx_to_shard = {}
+    settlements = []
+    owners = {}  # card_id -> shard, so each card is hashed once
+    for position in range(start, stop):
+        line = lines[position]
+        first = line.find(';') + 1
+        second = line.find(';', first)
+        if not first or second == -1:
+            continue  # Malformed, `_parse_line` drops it
+        event_type = line[first:second]
+        if event_type == "TX_SETTLED":
+            settlements.append((position, _field(line, ";transaction_id=")))
+            continue
+        card_id = _field(line, ";card_id=")
+        owner = owners.get(card_id)
+        if owner is None:
+            owner = owners[card_id] = zlib.crc32(str(card_id).encode()) % shards
+        positions[owner].append(position)
+        # Only a request that parses reaches `_apply_event`, so only it can claim settlements
+        if event_type == "TX_AUTH_REQUEST" and all('=' in item for item in line[second + 1:].split(';') if item):
+            tx_to_shard[_field(line, ";transaction_id=")] = owner
+    return positions, tx_to_shard, settlements
+
+
+def _replay_shard(positions: list, lines: list = None) -> tuple:
+    """Parses and replays the lines of one shard. Runs in a worker."""
+    lines = _partition_lines if lines is None else lines
+    service = AuthorizationService()
+    events = []
+    for position in positions:
+        event = service._parse_line(lines[position])
+        if event is not None:
+            events.append((event["timestamp"], position, event))
+    events.sort()  # Positions are unique, so the event dicts are never compared
+
+    state = service._new_state()
+    decisions = []
+    created = {}
+    settled = {}
+    for timestamp, position, event in events:
+        key = (timestamp, position)
+        event_type = event["type"]
+        if event_type == "CARD_CREATED":
+            created.setdefault(event["data"].get("card_id"), key)
+        elif event_type == "TX_SETTLED":
+            card_id = state["tx_to_card_map"].get(event["data"].get("transaction_id"))
+            if card_id is not None:
+                settled.setdefault(card_id, key)
+        decision = service._apply_event(state, event)
+        if decision is not None:
+            decisions.append((key, decision, event["data"].get("transaction_id")))
+
+    card_info = [(created[cid], cid, dict(info)) for cid, info in state["card_info"].items()]
+    settled_txs = [(settled[cid], cid, txs) for cid, txs in state["settled_txs"].items()]
+    return decisions, card_info, settled_txs
+
+
+class PartitionedAuthorizationService(AuthorizationService):
+    """
+    Runs the `AuthorizationService` engine across `workers` processes, one
+    card_id partition each, and merges the per-shard results so they match the
+    serial replay.
+    """
+
+    def __init__(self, workers: int = None, result_cache: ResultCache = None):
+        super().__init__(result_cache)
+        self.workers = workers or os.cpu_count() or 1
+
+    def _build_state(self, log: str) -> dict:
+        shards = self.workers
+        if shards == 1:
+            lines = log.strip().split('&')
+            routed = [_route_lines(0, len(lines), 1, lines)]
+            return self._merge_shards([_replay_shard(self._shard_positions(routed, 1)[0], lines)])
+
+        count = log.strip().count('&') + 1
+        bounds = [count * i // shards for i in range(shards + 1)]
+        # The raw log goes to each worker once, through the initializer
+        with ProcessPoolExecutor(max_workers=shards, initializer=_init_partition_worker,
+                                 initargs=(log,)) as executor:
+            routed = list(executor.map(_route_lines, bounds, bounds[1:], [shards] * shards))
+            results = list(executor.map(_replay_shard, self._shard_positions(routed, shards)))
+        return self._merge_shards(results)
+
+    @staticmethod
+    def _shard_positions(routed: list, shards: int) -> list:
+        """Joins the routed line positions per shard; a settlement follows the last request for its transaction."""
+        positions = [[] for _ in range(shards)]
+        tx_to_shard = {}
+        for chunk_positions, chunk_tx_to_shard, _ in routed:
+            for shard in range(shards):
+                positions[shard].extend(chunk_positions[shard])
+            tx_to_shard.update(chunk_tx_to_shard)
+        for _, _, settlements in routed:
+            for position, tx_id in settlements:
+                shard = tx_to_shard.get(tx_id)
+                if shard is not None:  # Never requested, so it can never settle
+                    positions[shard].append(position)
+        return positions
+
+    @staticmethod
+    def _merge_shards(results: list) -> dict:
+        auth_results = defaultdict(list)
+        for _, decision, tx_id in heapq.merge(*(result[0] for result in results)):
+            auth_results[decision].append(tx_id)
+        card_info = {cid: info for _, cid, info in sorted(c for result in results for c in result[1])}
+        settled_txs = {cid: txs for _, cid, txs in sorted(s for result in results for s in result[2])}
+
+        return {
+            "card_info": card_info,
+            "auth_results": auth_results,
+            "settled_txs": settled_txs
+        }
+
+
+# ===================================================================================
+# Point-in-Time Card State
+#
+# `CardLifeCycle.get_transaction_auth_v2` judges every authorization against the
+# card's final status and limit. To answer "what did card X look like at time T"
+# without replaying its whole history, each card's sorted events are replayed
+# once and a copy of the card's state is kept every `checkpoint_interval`
+# events. A query binary-searches the card's timeline, starts from the nearest
+# checkpoint before T and replays at most `checkpoint_interval` events.
+# ===================================================================================
+class CardStateHistory:
+    """
+    Checkpointed per-card timelines. Events are parsed and applied through
+    AuthorizationService, one card at a time, so point-in-time answers follow
+    the same transition rules as the live service.
+    """
+
+    def __init__(self, events: str, checkpoint_interval: int = 1024):
+        self.checkpoint_interval = checkpoint_interval
+        self._service = AuthorizationService()
+        # TX_SETTLED events carry no card_id and never change a card's status or limits
+        self._events = defaultdict(list)
+        for event in self._service._parse_and_sort_log(events):
+            card_id = event["data"].get("card_id")
+            if card_id is not None:
+                self._events[card_id].append(event)
+        self._timestamps = {}
+        self._checkpoints = {}
+        for card_id, timeline in self._events.items():
+            self._timestamps[card_id] = [event["timestamp"] for event in timeline]
+            self._checkpoints[card_id] = self._build_checkpoints(card_id, timeline)
+
+    def _replay(self, card_id: str, card: dict, events: list) -> dict:
+        """Applies `events` to one card's info (None before CARD_CREATED); returns the new info."""
+        state = self._service._new_state()
+        if card is not None:
+            state["card_info"][card_id] = dict(card)
+        for event in events:
+            self._service._apply_event(state, event)
+        card = state["card_info"].get(card_id)
+        return None if card is None else dict(card)
+
+    def _build_checkpoints(self, card_id: str, timeline: list) -> list:
+        """checkpoints[j] is the card's info after its first j * interval events."""
+        interval = self.checkpoint_interval
+        checkpoints = [None]
+        for end in range(interval, len(timeline) + 1, interval):
+            checkpoints.append(self._replay(card_id, checkpoints[-1], timeline[end - interval:end]))
+        return checkpoints
+
+    def state_at(self, card_id: str, timestamp: str) -> dict:
+        """Returns the card's state after every event at or before `timestamp`."""
+        if card_id not in self._events:
+            return None
+        applied = bisect.bisect_right(self._timestamps[card_id], timestamp)
+        checkpoint = applied // self.checkpoint_interval
+        start = checkpoint * self.checkpoint_interval
+        return self._replay(card_id, self._checkpoints[card_id][checkpoint], self._events[card_id][start:applied])
+
+
+def generate_card_log(n_events: int, n_cards: int = 1000, seed: int = 7) -> str:
+    """Synthetic, shuffled card traffic: creations, status changes, auth requests and settlements."""
+    rng = random.Random(seed)
+    lines = []
+    requested = []
+    for i in range(n_events):
+        timestamp = f"2025-07-01T{i:012d}Z"
+        card_id = f"card_{rng.randrange(n_cards)}"
+        roll = rng.random()
+        if roll < 0.05:
+            lines.append(f"{timestamp};CARD_CREATED;card_id={card_id};limit={rng.randint(1, 100) * 100}")
+        elif roll < 0.15:
+            status = rng.choice(("ACTIVE", "ACTIVE", "INACTIVE"))
+            lines.append(f"{timestamp};CARD_STATUS_CHANGED;card_id={card_id};status={status}")
+        elif roll < 0.75 or not requested:
+            lines.append(f"{timestamp};TX_AUTH_REQUEST;transaction_id=tx_{i};card_id={card_id};amount={rng.randint(1, 500)}")
+            requested.append(f"tx_{i}")
+        else:
+            lines.append(f"{timestamp};TX_SETTLED;transaction_id={requested.pop(rng.randrange(len(requested)))}")
+    rng.shuffle(lines)
+    return '&'.join(lines)
+
+
+def _timed(function, *args) -> tuple:
+    start = time.perf_counter()
+    result = function(*args)
+    return time.perf_counter() - start, result
+
+
+def benchmark_partitioned(workers: int = 4, *sizes: int) -> None:
+    """
+    Times the serial replay against the partitioned one. `route` and `replay`
+    are the slowest worker in each round, every task timed alone in a worker
+    process; `parent` is the settlement routing plus the merge. With a core per
+    worker, the partitioned wall time approaches their sum.
+    """
+    print(f"{'events':>10} {'serial':>8} {'pool':>8} {'route':>7} {'replay':>7} {'parent':>7} {'speedup':>8}"
+          f"  (cores: {os.cpu_count()})")
+    for size in sizes:
+        log = generate_card_log(size)
+        start = time.perf_counter()
+        expected = AuthorizationService()._build_state(log)
+        serial = time.perf_counter() - start
+
+        start = time.perf_counter()
+        PartitionedAuthorizationService(workers=workers)._build_state(log)
+        pool = time.perf_counter() - start
+
+        count = log.strip().count('&') + 1
+        bounds = [count * i // workers for i in range(workers + 1)]
+        with ProcessPoolExecutor(max_workers=1, initializer=_init_partition_worker, initargs=(log,)) as executor:
+            routed = list(executor.map(_timed, [_route_lines] * workers, bounds, bounds[1:], [workers] * workers))
+            start = time.perf_counter()
+            positions = PartitionedAuthorizationService._shard_positions([result for _, result in routed], workers)
+            parent = time.perf_counter() - start
+            replayed = list(executor.map(_timed, [_replay_shard] * workers, positions))
+        start = time.perf_counter()
+        merged = PartitionedAuthorizationService._merge_shards([result for _, result in replayed])
+        parent += time.perf_counter() - start
+        assert all(merged[key] == expected[key] for key in merged)
+
+        route = max(elapsed for elapsed, _ in routed)
+        replay = max(elapsed for elapsed, _ in replayed)
+        print(f"{size:>10} {serial:>8.3f} {pool:>8.3f} {route:>7.3f} {replay:>7.3f} {parent:>7.3f}"
+              f" {serial / (route + replay + parent):>7.2f}x")
+
 
 if __name__ == "__main__":
     log_simple = (
@@ -328,4 +749,36 @@ if __name__ == "__main__":
 
     print("## Part 4: Final Card Ledger Summary ##")
     print(service.generate_ledger_summary(log_complex))
-    print("-" * 50)
\ No newline at end of file
+    print("-" * 50)
+
+    print("## Streaming: Incremental Authorization ##")
+    streaming = StreamingAuthorizationService(reorder_window=4)
+    streaming.ingest_log(log_complex)
+    print(streaming.generate_ledger_summary())
+    print(streaming.authorize_transactions_simple() == service.authorize_transactions_simple(log_complex))
+    print(streaming.authorize("2025-07-01T10:09:00Z;TX_AUTH_REQUEST;transaction_id=tx_D;card_id=card_Y;amount=400"))
+    print(streaming.authorize_with_holds(""))
+    print("-" * 50)
+
+    print("## Partitioned: Sharded Replay Matches Serial ##")
+    partitioned = PartitionedAuthorizationService(workers=2)
+    print(partitioned.generate_ledger_summary(log_complex) == service.generate_ledger_summary(log_complex))
+    print("-" * 50)
+
+    print("## Shared Result Cache ##")
+    cache = ResultCache()
+    cached_service = AuthorizationService(result_cache=cache)
+    for log in (log_simple, log_complex, log_simple, log_complex):
+        cached_service.authorize_with_holds(log)
+    print(cache.stats())
+    print("-" * 50)
+
+    print("## Point-in-Time: card_X Before and After tx_A ##")
+    history = CardStateHistory(log_complex, checkpoint_interval=2)
+    print(history.state_at("card_X", "2025-07-01T10:04:00Z"))
+    print(history.state_at("card_X", "2025-07-01T10:05:00Z"))
+    print("-" * 50)
+
+    if "--benchmark" in sys.argv:
+        sizes = [int(arg) for arg in sys.argv[sys.argv.index("--benchmark") + 1:]]
+        benchmark_partitioned(4, *(sizes or [100_000, 1_000_000]))
@@ -1,3 +1,5 @@
+import bisect
+import heapq
 from collections import defaultdict
 
 """
@@ -129,10 +131,236 @@ class PaymentRouting:
             ans.add(trg)   
         return ans  
     
+class RouteIndex:
+    """
+    Prebuilt adjacency index over the route feed: country -> list of
+    (fee, processor, destination) edges sorted by fee. Built once and reused,
+    so queries never touch the raw '~' string.
+    """
+
+    def __init__(self, graph: dict):
+        self.adjacency = {
+            src: sorted((route["fee"], route["processor"], route["destination"]) for route in routes)
+            for src, routes in graph.items()
+        }
+
+    def cheapest_route(self, source: str, destination: str, max_hops: int = None, exclude_processors=None) -> dict:
+        """
+        Heap-based (Dijkstra) any-hop cheapest path. `max_hops` caps the number
+        of legs and `exclude_processors` removes those networks from the search.
+        """
+        excluded = set(exclude_processors or ())
+        # Fewest legs seen for each settled country; a costlier pop only helps
+        # if it reaches the country in fewer legs (matters under max_hops).
+        settled = {}
+        heap = [(0, 0, source, ())]
+        while heap:
+            fee, hops, country, path = heapq.heappop(heap)
+            if country == destination:
+                return {"path": list(path), "total_fee": fee}
+            if settled.get(country, float("inf")) <= hops:
+                continue
+            settled[country] = hops
+            if max_hops is not None and hops >= max_hops:
+                continue
+            for edge_fee, processor, next_country in self.adjacency.get(country, ()):
+                if processor in excluded or settled.get(next_country, float("inf")) <= hops + 1:
+                    continue
+                heapq.heappush(heap, (fee + edge_fee, hops + 1, next_country, path + (processor,)))
+        return None
+
+    def _restricted_route(self, source: str, destination: str, banned_legs: set, banned_countries: set):
+        """Dijkstra that skips the given legs and countries; returns (fee, legs) or None."""
+        fees = {source: 0}
+        parents = {}
+        heap = [(0, source)]
+        while heap:
+            fee, country = heapq.heappop(heap)
+            if country == destination:
+                legs = []
+                while country != source:
+                    leg = parents[country]
+                    legs.append(leg)
+                    country = leg[0]
+                return fee, legs[::-1]
+            if fee > fees[country]:
+                continue
+            for edge_fee, processor, next_country in self.adjacency.get(country, ()):
+                leg = (country, processor, next_country, edge_fee)
+                if next_country in banned_countries or leg in banned_legs:
+                    continue
+                candidate = fee + edge_fee
+                if candidate < fees.get(next_country, float("inf")):
+                    fees[next_country] = candidate
+                    parents[next_country] = leg
+                    heapq.heappush(heap, (candidate, next_country))
+        return None
+
+    def k_cheapest_routes(self, source: str, destination: str, k: int) -> list:
+        """
+        Yen's algorithm: the k cheapest loopless routes, cheapest first. Each
+        route is a list of (country, processor, next_country, fee) legs.
+        """
+        first = self._restricted_route(source, destination, set(), set())
+        if first is None or k <= 0:
+            return []
+        found = [first]
+        seen = {tuple(first[1])}
+        candidates = []
+        while len(found) < k:
+            _, previous = found[-1]
+            for i in range(len(previous)):
+                root = previous[:i]
+                spur_country = previous[i][0]
+                banned_legs = {legs[i] for _, legs in found if legs[:i] == root}
+                banned_countries = {leg[0] for leg in root}
+                spur = self._restricted_route(spur_country, destination, banned_legs, banned_countries)
+                if spur is None:
+                    continue
+                legs = root + spur[1]
+                if tuple(legs) not in seen:
+                    seen.add(tuple(legs))
+                    heapq.heappush(candidates, (sum(leg[3] for leg in legs), len(legs), legs))
+            if not candidates:
+                break
+            fee, _, legs = heapq.heappop(candidates)
+            found.append((fee, legs))
+        return found
+
+    def countries(self) -> set:
+        countries = set(self.adjacency)
+        for edges in self.adjacency.values():
+            countries.update(destination for _, _, destination in edges)
+        return countries
+
+    def edge_fee(self, source: str, processor: str, destination: str):
+        for fee, edge_processor, edge_destination in self.adjacency.get(source, ()):
+            if edge_processor == processor and edge_destination == destination:
+                return fee
+        return None
+
+    def update_edge(self, source: str, processor: str, destination: str, fee) -> None:
+        """Sets the fee of one processor leg; a fee of None removes the leg."""
+        edges = [edge for edge in self.adjacency.get(source, ())
+                 if not (edge[1] == processor and edge[2] == destination)]
+        if fee is not None:
+            bisect.insort(edges, (fee, processor, destination))
+        if edges:
+            self.adjacency[source] = edges
+        else:
+            self.adjacency.pop(source, None)  # An empty entry would still list `source` in countries()
+
+    def shortest_tree(self, source: str, fees: dict = None, parents: dict = None, heap: list = None) -> tuple:
+        """
+        Dijkstra from `source` returning (fees, parents), where parents maps a
+        country to the (previous_country, processor) leg that reaches it. Passing
+        partial fees/parents and a seeded heap continues an earlier search.
+        """
+        fees = {source: 0} if fees is None else fees
+        parents = {} if parents is None else parents
+        heap = [(0, source)] if heap is None else heap
+        while heap:
+            fee, country = heapq.heappop(heap)
+            if fee > fees.get(country, float("inf")):
+                continue
+            for edge_fee, processor, next_country in self.adjacency.get(country, ()):
+                candidate = fee + edge_fee
+                if candidate < fees.get(next_country, float("inf")):
+                    fees[next_country] = candidate
+                    parents[next_country] = (country, processor)
+                    heapq.heappush(heap, (candidate, next_country))
+        return fees, parents
+
+
+    @staticmethod
+    def route_from_tree(fees: dict, parents: dict, source: str, destination: str) -> dict:
+        """Rebuilds a {"path", "total_fee"} result from a `shortest_tree` search."""
+        fee = fees.get(destination)
+        if fee is None:
+            return None
+        path = []
+        country = destination
+        while country != source:
+            country, processor = parents[country]
+            path.append(processor)
+        return {"path": path[::-1], "total_fee": fee}
+
+
+class RoutingTable:
+    """
+    All-pairs cheapest fees, precomputed with one Dijkstra per source country so
+    that `lookup` is a pair of dict reads. `update_fee` keeps the table current
+    when one processor leg changes, re-searching only the sources it affects.
+    """
+
+    def __init__(self, index: RouteIndex):
+        self.index = index
+        self.fees = {}
+        self.parents = {}
+        for country in index.countries():
+            self._recompute(country)
+
+    def _recompute(self, source: str) -> None:
+        self.fees[source], self.parents[source] = self.index.shortest_tree(source)
+
+    def lookup(self, source: str, destination: str):
+        """Cheapest total fee from source to destination, or None if unreachable."""
+        return self.fees.get(source, {}).get(destination)
+
+    def route(self, source: str, destination: str) -> dict:
+        """Same shape as SmartRouter's route results, rebuilt from the parent legs."""
+        if source not in self.fees:
+            return None
+        return RouteIndex.route_from_tree(self.fees[source], self.parents[source], source, destination)
+
+    def update_fee(self, source: str, processor: str, destination: str, fee) -> int:
+        """
+        Applies one changed leg (fee None removes it) and returns how many
+        source rows had to be touched.
+        """
+        old_fee = self.index.edge_fee(source, processor, destination)
+        if fee is None and old_fee is None:
+            return 0  # Removing a leg that was never there
+        self.index.update_edge(source, processor, destination, fee)
+        if fee is not None:
+            # Only an added leg can bring in new countries
+            for country in (source, destination):
+                if country not in self.fees:
+                    self.fees[country], self.parents[country] = {country: 0}, {}
+
+        touched = 0
+        if old_fee is not None and (fee is None or fee > old_fee):
+            # A leg got worse: only trees that route through it can change.
+            for tree_source, parents in self.parents.items():
+                if parents.get(destination) == (source, processor):
+                    self._recompute(tree_source)
+                    touched += 1
+            if fee is None:
+                # A country left with no legs has no row in a rebuilt table either
+                for country in (source, destination):
+                    if country not in self.index.adjacency and not any(
+                            country in fees for tree_source, fees in self.fees.items() if tree_source != country):
+                        del self.fees[country], self.parents[country]
+            return touched
+
+        # A leg got cheaper (or is new): continue each search from `destination`
+        # only where the leg now beats the current best.
+        for tree_source, fees in self.fees.items():
+            if source not in fees:
+                continue
+            candidate = fees[source] + fee
+            if candidate < fees.get(destination, float("inf")):
+                fees[destination] = candidate
+                self.parents[tree_source][destination] = (source, processor)
+                self.index.shortest_tree(tree_source, fees, self.parents[tree_source], [(candidate, destination)])
+                touched += 1
+        return touched
+
+
 class SmartRouter:
     def _build_graph(self, data: str) -> dict:
         graph = defaultdict(list)
-        for route_str in routes_data.strip().split("~"):
+        for route_str in data.strip().split("~"):
             src, processor, destination, fee = route_str.split(":")
             graph[src].append({
                 "destination": destination,
@@ -141,6 +369,14 @@ class SmartRouter:
                 
             })          
         return graph
+
+    def _get_index(self, routes_data: str) -> RouteIndex:
+        """Builds the RouteIndex once per route feed (memoized on the last feed)."""
+        if not hasattr(self, '_cached_index') or self._cached_routes != routes_data:
+            self._cached_routes = routes_data
+            self._cached_index = RouteIndex(self._build_graph(routes_data))
+            self._k_routes_cache = {}  # Results for the old feed are stale
+        return self._cached_index
     
     def find_direct_route(self, source: str, destination: str, data: str) -> tuple:
         graph = self._build_graph(data)
@@ -167,7 +403,7 @@ class SmartRouter:
                    "path": [route["processor"]],
                    "total_fee": route["fee"]
                })  
-        for route in graph["source"]:
+        for route in graph[source]:
             intermediate = route["destination"]
             for intermediate_route in graph[intermediate]:
                 if intermediate_route["destination"] == destination:
@@ -183,7 +419,48 @@ class SmartRouter:
         if not all_options:
             return None
         
-        return min(all_options, key=lambda x: x["total_fee"])            
+        return min(all_options, key=lambda x: x["total_fee"])
+
+    def find_k_cheapest_routes(self, routes_data: str, source: str, destination: str, k: int) -> list:
+        """
+        Top-k loopless routes ranked by total fee, for failover ordering.
+        Cached per (source, destination, k) until the route feed changes; the
+        cache holds tuples and every call gets fresh lists it may mutate.
+        """
+        index = self._get_index(routes_data)
+        key = (source, destination, k)
+        if key not in self._k_routes_cache:
+            self._k_routes_cache[key] = tuple(
+                (tuple(leg[1] for leg in legs), fee)
+                for fee, legs in index.k_cheapest_routes(source, destination, k)
+            )
+        return [{"path": list(path), "total_fee": fee} for path, fee in self._k_routes_cache[key]]
+
+    def route_many(self, routes_data: str, pairs: list) -> dict:
+        """
+        Answers many (source, destination) queries against one parsed graph.
+        Queries are grouped by source so each source's shortest-path tree is
+        computed once; routes come back in input order.
+        """
+        index = self._get_index(routes_data)
+        trees = {}
+        routes = []
+        for source, destination in pairs:
+            if source not in trees:
+                trees[source] = index.shortest_tree(source)
+            fees, parents = trees[source]
+            routes.append(RouteIndex.route_from_tree(fees, parents, source, destination))
+        return {"routes": routes, "searches": len(trees), "searches_saved": len(pairs) - len(trees)}
+
+    def build_routing_table(self, routes_data: str) -> RoutingTable:
+        """Precomputes all-pairs cheapest fees for hot-corridor lookups."""
+        return RoutingTable(RouteIndex(self._build_graph(routes_data)))
+
+    def find_cheapest_overall_route(self, routes_data: str, source: str, destination: str,
+                                    max_hops: int = None, exclude_processors=None) -> dict:
+        """Solves Part 4: cheapest route with any number of hops."""
+        index = self._get_index(routes_data)
+        return index.cheapest_route(source, destination, max_hops, exclude_processors)
                 
             
 if __name__ == "__main__":
@@ -227,9 +504,42 @@ if __name__ == "__main__":
 
     # --- Part 4 ---
     print("## Part 4: Cheapest Overall Route (Any Hops) ##")
-    # This tests a path with more than one hop: CA -> US -> GB -> DE -> JP
-    # Path: CA -> US (10) -> GB (15) -> DE (5) -> JP (30) = Total Fee 60
-    # print(router.find_cheapest_overall_route(routes_data, "CA", "JP"))
+    # This tests a path with more than one hop: CA -> US -> GB -> JP
+    # Path: CA -> US (10) -> GB (15) -> JP (25) = Total Fee 50
+    smart_router = SmartRouter()
+    print(smart_router.find_cheapest_overall_route(routes_data, "CA", "JP"))
+    # Expected: CA -> US -> JP via Routely = 100 when capped at two legs
+    print(smart_router.find_cheapest_overall_route(routes_data, "CA", "JP", max_hops=2))
+    # Expected: US -> DE -> JP = 50 without StripeNet's GB leg
+    print(smart_router.find_cheapest_overall_route(routes_data, "US", "JP", exclude_processors={"StripeNet"}))
+    print("-" * 50)
+
+
+    # --- Failover Ordering ---
+    print("## K-Cheapest Routes ##")
+    # Expected: US -> JP at 40 (via GB), 50 (via DE), 50 (via GB, DE), 90 (direct)
+    for option in smart_router.find_k_cheapest_routes(routes_data, "US", "JP", 4):
+        print(option)
+    print("-" * 50)
+
+
+    # --- Batch Queries ---
+    print("## Batch Routing ##")
+    # Expected: three searches for five pairs, so two saved
+    batch = smart_router.route_many(routes_data, [("US", "JP"), ("CA", "JP"), ("US", "DE"), ("GB", "JP"), ("CA", "DE")])
+    print(batch["routes"])
+    print(f"searches: {batch['searches']}, saved: {batch['searches_saved']}")
+    print("-" * 50)
+
+
+    # --- Precomputed Routing Table ---
+    print("## All-Pairs Routing Table ##")
+    table = smart_router.build_routing_table(routes_data)
+    print(table.lookup("CA", "JP"), table.route("CA", "JP"))
+    # GB -> JP via Swift gets more expensive; CA -> JP now goes through DE (60)
+    print(table.update_fee("GB", "Swift", "JP", 40), table.route("CA", "JP"))
+    # Expected: removing a leg that does not exist touches nothing and adds no rows
+    print(table.update_fee("XX", "Swift", "YY", None), table.lookup("XX", "XX"), table.lookup("YY", "YY"))
     print("-" * 50)
             
         
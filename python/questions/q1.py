@@ -30,7 +30,11 @@ Part 4: Automatic Credit Application
 """
 
 
+import heapq
+import os
+import zlib
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 
 class Bank:
     
@@ -154,6 +158,172 @@ class Bank:
             "customer_balance": invoice_info["customer_balance"]
         }          
                                  
+class InvoiceRecord:
+    __slots__ = ("invoice_id", "customer_id", "amount_due", "balance_due", "status", "age")
+
+    def __init__(self, invoice_id: str, customer_id: str, amount_due: int, age: tuple):
+        self.invoice_id = invoice_id
+        self.customer_id = customer_id
+        self.amount_due = amount_due
+        self.balance_due = amount_due
+        self.status = "UNPAID"
+        self.age = age
+
+
+class ReconciliationEngine:
+    """
+    Long-lived reconciliation state for a stream of deposits.
+
+    Outstanding invoices are indexed by invoice_id, and each customer's open
+    invoices sit in a min-heap keyed by age, so credits always go to the
+    oldest invoice first. Age is the optional fourth invoice field
+    (`invoice_id,customer_id,amount_due,issued_on`) and falls back to the
+    order invoices were added. Paid invoices are dropped from the heaps lazily.
+    """
+
+    def __init__(self, invoices: list[str] = ()):
+        self.invoices = {}
+        self.open_by_customer = defaultdict(list)   # customer_id -> heap of (age, invoice_id)
+        self.customer_balance = defaultdict(int)    # customer_id -> sum of open balance_due
+        self.customer_credit = defaultdict(int)
+        self._added = 0
+        for invoice in invoices:
+            self.add_invoice(invoice)
+
+    def add_invoice(self, invoice: str) -> None:
+        invoice_tokens = invoice.split(",")
+        invoice_id, customer_id, amount_due = invoice_tokens[0], invoice_tokens[1], int(invoice_tokens[2])
+        issued_on = invoice_tokens[3] if len(invoice_tokens) > 3 else ""
+        record = InvoiceRecord(invoice_id, customer_id, amount_due, (issued_on, self._added))
+        self._added += 1
+        self.invoices[invoice_id] = record
+        heapq.heappush(self.open_by_customer[customer_id], (record.age, invoice_id))
+        self.customer_balance[customer_id] += amount_due
+
+    def _pay(self, record: InvoiceRecord, amount: int) -> int:
+        """Applies up to `amount` to one invoice and returns what was left over."""
+        applied = min(amount, record.balance_due)
+        record.balance_due -= applied
+        self.customer_balance[record.customer_id] -= applied
+        record.status = "PAID" if record.balance_due == 0 else "PARTIALLY_PAID"
+        return amount - applied
+
+    def _apply_credit(self, customer_id: str, changed: dict) -> None:
+        heap = self.open_by_customer[customer_id]
+        while self.customer_credit[customer_id] > 0 and heap:
+            record = self.invoices[heap[0][1]]
+            if record.status == "PAID":
+                heapq.heappop(heap)  # Closed by a direct payment earlier
+                continue
+            self.customer_credit[customer_id] = self._pay(record, self.customer_credit[customer_id])
+            changed[record.invoice_id] = record.status
+
+    def process_deposit(self, deposit: str) -> dict:
+        """
+        Applies one `deposit_id|customer_id:amount_paid:invoice_id|...` string,
+        then the resulting credits. Returns the statuses of invoices it changed.
+        Payments for unknown, already-paid or another customer's invoices
+        become customer credit.
+        """
+        changed = {}
+        customers = []
+        for token in deposit.split("|")[1:]:
+            customer_id, amount_paid, invoice_id = token.split(":")
+            record = self.invoices.get(invoice_id)
+            leftover = int(amount_paid)
+            if record is not None and record.customer_id == customer_id and record.status != "PAID":
+                leftover = self._pay(record, leftover)
+                changed[invoice_id] = record.status
+            self.customer_credit[customer_id] += leftover
+            customers.append(customer_id)
+
+        for customer_id in dict.fromkeys(customers):
+            self._apply_credit(customer_id, changed)
+        return changed
+
+    def process_deposits(self, deposits) -> dict:
+        """Reconciles a stream of deposits; returns the final status of every changed invoice."""
+        changed = {}
+        for deposit in deposits:
+            changed.update(self.process_deposit(deposit))
+        return changed
+
+    def get_invoices_status(self) -> dict:
+        return {
+            "invoices": {invoice_id: record.status for invoice_id, record in self.invoices.items()},
+            "customer_balance": {customer_id: {"balance_due": balance} for customer_id, balance in self.customer_balance.items()},
+            "customer_credit": {customer_id: credit for customer_id, credit in self.customer_credit.items() if credit}
+        }
+
+
+def _reconcile_shard(shard: tuple) -> dict:
+    """Reconciles one customer partition of (invoices, deposits). Runs in a worker."""
+    invoices, deposits = shard
+    engine = ReconciliationEngine(invoices)
+    engine.process_deposits(deposits)
+    return engine.get_invoices_status()
+
+
+class PartitionedReconciler:
+    """
+    Customers only interact with their own invoices, credit and balance, so a
+    day's deposits can be reconciled per customer partition in parallel. Each
+    deposit is split into per-partition sub-deposits (same deposit_id, same
+    line-item order), every partition runs its own ReconciliationEngine, and
+    the results are merged back in input order so the output does not depend
+    on the number of workers.
+    """
+
+    def __init__(self, workers: int = None):
+        self.workers = workers or os.cpu_count() or 1
+
+    def _partition(self, customer_id: str) -> int:
+        return zlib.crc32(customer_id.encode()) % self.workers
+
+    def reconcile(self, deposits: list[str], invoices: list[str]) -> dict:
+        """Returns the same shape as ReconciliationEngine.get_invoices_status()."""
+        shard_invoices = [[] for _ in range(self.workers)]
+        invoice_ids = []
+        for invoice in invoices:
+            invoice_id, customer_id, _ = invoice.split(",", 2)
+            invoice_ids.append(invoice_id)
+            shard_invoices[self._partition(customer_id)].append(invoice)
+
+        shard_deposits = [[] for _ in range(self.workers)]
+        for deposit in deposits:
+            deposit_tokens = deposit.split("|")
+            items = [[] for _ in range(self.workers)]
+            for token in deposit_tokens[1:]:
+                items[self._partition(token.split(":", 1)[0])].append(token)
+            for shard, shard_items in enumerate(items):
+                if shard_items:
+                    shard_deposits[shard].append("|".join([deposit_tokens[0]] + shard_items))
+
+        shards = [shard for shard in zip(shard_invoices, shard_deposits) if shard[0] or shard[1]]
+        if self.workers == 1 or len(shards) <= 1:
+            results = [_reconcile_shard(shard) for shard in shards]
+        else:
+            with ProcessPoolExecutor(max_workers=self.workers) as executor:
+                results = list(executor.map(_reconcile_shard, shards))
+
+        statuses, balances, credits = {}, {}, {}
+        for result in results:
+            statuses.update(result["invoices"])
+            balances.update(result["customer_balance"])
+            credits.update(result["customer_credit"])
+        # Rebuild every mapping in input order so the merge is deterministic:
+        # balances follow the invoice list, credits follow the deposits.
+        invoice_customers = dict.fromkeys(invoice.split(",", 2)[1] for invoice in invoices)
+        paying_customers = dict.fromkeys(
+            token.split(":", 1)[0] for deposit in deposits for token in deposit.split("|")[1:]
+        )
+        return {
+            "invoices": {invoice_id: statuses[invoice_id] for invoice_id in dict.fromkeys(invoice_ids)},
+            "customer_balance": {customer_id: balances[customer_id] for customer_id in invoice_customers},
+            "customer_credit": {customer_id: credits[customer_id] for customer_id in paying_customers if customer_id in credits}
+        }
+
+
 if __name__ == "__main__":
     # --- Part 1 Test Data ---
     deposit_p1 = "dep_01|cust_A:1000:inv_101|cust_B:2500:inv_102|cust_C:500:inv_103"
@@ -189,4 +359,19 @@ if __name__ == "__main__":
 
     print("## Part 4: Automatic Credit Application ##")
     print(service.get_invoices_status(deposit_p4, invoices_p4))
-    print("-" * 50)        
\ No newline at end of file
+    print("-" * 50)        
+
+    print("## Reconciliation Engine: Oldest-First Credits Across Deposits ##")
+    # inv_303 is dated older than inv_302, so the 500 credit settles it first
+    engine = ReconciliationEngine(["inv_301,cust_M,2500,2025-03-01", "inv_302,cust_M,400,2025-02-01", "inv_303,cust_M,500,2025-01-01"])
+    print(engine.process_deposits([deposit_p4, "dep_04|cust_M:100:inv_302"]))
+    print(engine.get_invoices_status())
+    print("-" * 50)
+
+    print("## Partitioned Reconciliation Matches the Single Engine ##")
+    day_deposits = [deposit_p1, deposit_p3, deposit_p4]
+    day_invoices = invoices_p1 + invoices_p3 + invoices_p4
+    single = ReconciliationEngine(day_invoices)
+    single.process_deposits(day_deposits)
+    print(PartitionedReconciler(workers=3).reconcile(day_deposits, day_invoices) == single.get_invoices_status())
+    print("-" * 50)
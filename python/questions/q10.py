@@ -7,6 +7,7 @@ Part 3: Write a method that returns the minimum cost and involved shipping metho
 
 During the phone screen, I successfully solved the first three parts and ran test cases for each. Unfortunately, I ran out of time before I could get to the fourth part. I coded in C++, though I’d recommend using a language like Python to simplify input parsing. """
 
+import math
 from collections import defaultdict
 
 class Conversion:
@@ -31,6 +32,9 @@ class Conversion:
         if source not in graph:
             return ValueError("Invalid Valu")
         
+        return self._convert_direct(graph, source, destination, amount)
+
+    def _convert_direct(self, graph: dict, source: str, destination: str, amount:int) -> list:
         destination_map = graph[source]
         ans = []
         for conversion in destination_map[destination]:
@@ -49,8 +53,7 @@ class Conversion:
         if source not in graph:
             return ValueError("Invalid Valu")
         
-        destination_map = graph[source] 
-        direct_conversion = self.convert(conversion_string, source, destination, amount)
+        direct_conversion = self._convert_direct(graph, source, destination, amount)
         if direct_conversion:
             return direct_conversion
         ans = []
@@ -78,6 +81,136 @@ class Conversion:
         return min(all_routes, key = lambda x:x["total_cost"])         
                    
     
+class ConversionGraph:
+    """
+    A conversion graph parsed once and reused across queries. Rates multiply
+    along a path, so the best (highest) rate is the shortest path under
+    -log(rate) weights. Those weights can be negative, so searches use
+    Bellman-Ford, which also exposes arbitrage as a negative cycle.
+    """
+
+    EPSILON = 1e-12
+
+    def __init__(self, conversion_string: str):
+        if not conversion_string:
+            raise ValueError("Invalid Input")
+        # Only the best carrier between two currencies can be on a best path.
+        best = {}
+        for token in conversion_string.split(","):
+            source, destination, carrier, rate = token.split(":")
+            rate = float(rate)
+            if rate <= 0:
+                raise ValueError(f"Invalid rate for {token}")
+            if (source, destination) not in best or rate > best[(source, destination)][1]:
+                best[(source, destination)] = (carrier, rate)
+
+        self.currencies = sorted({currency for pair in best for currency in pair})
+        self.edges = [(src, dst, -math.log(rate), rate, carrier) for (src, dst), (carrier, rate) in best.items()]
+        self._trees = {}
+
+    def _relax_all(self, dist: dict, parent: dict) -> list:
+        """One Bellman-Ford pass; returns the currencies whose distance improved."""
+        improved = []
+        for src, dst, weight, rate, carrier in self.edges:
+            if src in dist and dist[src] + weight < dist.get(dst, math.inf) - self.EPSILON:
+                dist[dst] = dist[src] + weight
+                parent[dst] = (src, rate, carrier)
+                improved.append(dst)
+        return improved
+
+    def _tree(self, source: str) -> tuple:
+        """Bellman-Ford from `source`, cached. Returns (dist, parent, unbounded)."""
+        if source not in self._trees:
+            dist = {source: 0.0}
+            parent = {}
+            for _ in range(len(self.currencies) - 1):
+                if not self._relax_all(dist, parent):
+                    break
+            # Anything still improving, or reachable from it, sits behind an arbitrage cycle.
+            unbounded = set(self._relax_all(dict(dist), dict(parent)))
+            frontier = list(unbounded)
+            while frontier:
+                currency = frontier.pop()
+                for src, dst, _, _, _ in self.edges:
+                    if src == currency and dst not in unbounded:
+                        unbounded.add(dst)
+                        frontier.append(dst)
+            self._trees[source] = (dist, parent, unbounded)
+        return self._trees[source]
+
+    def best_rate(self, source: str, target: str) -> dict:
+        """Highest-rate conversion path with any number of hops, or None if unreachable."""
+        dist, parent, unbounded = self._tree(source)
+        if target in unbounded:
+            raise ValueError(f"{source} -> {target} passes an arbitrage cycle")
+        if target not in dist:
+            return None
+        path = [target]
+        carriers = []
+        rate = 1.0
+        currency = target
+        while currency != source:
+            currency, leg_rate, carrier = parent[currency]
+            path.append(currency)
+            carriers.append(carrier)
+            rate *= leg_rate
+        return {"path": path[::-1], "carriers": carriers[::-1], "rate": rate}
+
+    def convert_many(self, queries: list) -> list:
+        """
+        Answers (source, target, amount) queries in order; searches are shared
+        per source. Each answer stands alone: None when unreachable, and
+        {"error": ...} when the target sits behind an arbitrage cycle.
+        """
+        results = []
+        for source, target, amount in queries:
+            try:
+                best = self.best_rate(source, target)
+            except ValueError as e:
+                results.append({"error": str(e)})
+                continue
+            results.append(None if best is None else dict(best, amount_final=amount * best["rate"]))
+        return results
+
+    def find_arbitrage_cycles(self) -> list:
+        """
+        Bellman-Ford from a virtual source linked to every currency. Each
+        negative cycle found is reported with its currencies, carriers and the
+        rate gained by going once around it.
+        """
+        dist = {currency: 0.0 for currency in self.currencies}
+        parent = {}
+        improved = []
+        for _ in range(len(self.currencies)):
+            improved = self._relax_all(dist, parent)
+            if not improved:
+                return []
+
+        cycles = []
+        seen = set()
+        for currency in improved:
+            # Walking back |V| parents is guaranteed to land inside the cycle.
+            for _ in range(len(self.currencies)):
+                currency = parent[currency][0]
+            if currency in seen:
+                continue
+            # Walk the cycle backwards, then flip it into conversion order.
+            cycle = [currency]
+            carriers = []
+            rate = 1.0
+            node = currency
+            while True:
+                node, leg_rate, carrier = parent[node]
+                cycle.append(node)
+                carriers.append(carrier)
+                rate *= leg_rate
+                if node == currency:
+                    break
+            seen.update(cycle)
+            cycles.append({"cycle": cycle[::-1], "carriers": carriers[::-1], "rate": rate})
+        return cycles
+
+
 if __name__ == "__main__":
     conversion = Conversion()
      
@@ -91,4 +224,14 @@ if __name__ == "__main__":
         
         
             
-        
\ No newline at end of file
+        
+
+    graph = ConversionGraph(conversion_string)
+    # Expected: USD -> CAD -> INR at rate 6 beats USD -> GBP -> INR at rate 4
+    print(graph.best_rate("USD", "INR"))
+    print(graph.convert_many([("USD", "INR", 10), ("USD", "GBP", 5), ("CAD", "USD", 1)]))
+    print(graph.find_arbitrage_cycles())
+
+    # Expected: USD -> EUR -> GBP -> USD multiplies to 1.026
+    arbitrage = ConversionGraph("USD:EUR:DHL:0.9,EUR:GBP:UPS:0.9,GBP:USD:FEDX:1.2667,USD:JPY:DHL:150")
+    print(arbitrage.find_arbitrage_cycles())
@@ -37,81 +37,185 @@ Part 4: Generating a Payout Statement
   payout.
 """
 
+import bisect
+import os
+import pickle
+import random
+import struct
+import sys
+import tempfile
+import threading
+import time
 from collections import defaultdict
+from operator import itemgetter
+
+
+class AccountBalance:
+    """Per-account balance record; __slots__ keeps millions of accounts compact."""
+    __slots__ = ("available_balance", "total_balance")
+
+    def __init__(self):
+        self.available_balance = 0
+        self.total_balance = 0
+
+    def as_dict(self) -> dict:
+        return {"available_balance": self.available_balance, "total_balance": self.total_balance}
+
+
+class LedgerEngine:
+    """
+    Ledger state built on indexes so every event is applied in O(1): pending
+    charges live in a set, pending payouts and succeeded charge amounts in
+    dicts keyed by transaction id. Events must be applied in timestamp order.
+
+    Payout statements are served from a payout-boundary index: each succeeded
+    payout's position in its account's success sequence, plus a running prefix
+    sum of the balance effect of that sequence.
+    """
+
+    def __init__(self):
+        self.balances = {}                              # account_id -> AccountBalance
+        self.pending_charges = set()
+        self.pending_payouts = {}                       # payout_id -> available balance when triggered
+        self.charge_amounts = {}                        # succeeded charge_id -> amount
+        self.transaction_accounts = {}                  # transaction_id -> account_id
+        self.successful_transactions = defaultdict(list)
+        self.payout_positions = {}                      # payout_id -> (account_id, position)
+        self.payout_boundaries = defaultdict(list)      # account_id -> sorted payout positions
+        self.prefix_amounts = {}                        # account_id -> [0, running net amount...]
+
+    def _balance(self, account_id: str) -> AccountBalance:
+        balance = self.balances.get(account_id)
+        if balance is None:
+            balance = self.balances[account_id] = AccountBalance()
+        return balance
+
+    def validate(self, event: tuple) -> None:
+        """Raises the error `apply` would raise for `event`, without changing any state."""
+        _, _, _, event_type, _, status, linked_id = event
+        if status == "SUCCEEDED" and event_type == "REFUND" and linked_id not in self.charge_amounts:
+            raise KeyError(linked_id)
+
+    def apply(self, event: tuple) -> None:
+        """Applies one (timestamp, transaction_id, account_id, type, amount, status, linked_id) event."""
+        _, transaction_id, account_id, event_type, amount, status, linked_id = event
+        self.transaction_accounts[transaction_id] = account_id
+        if status == "PENDING":
+            balance = self._balance(account_id)
+            if event_type == "CHARGE":
+                balance.total_balance += amount
+                self.pending_charges.add(transaction_id)
+            elif event_type == "REFUND":
+                balance.total_balance += amount
+            elif event_type == "FEE":
+                balance.total_balance -= amount
+            elif event_type == "PAYOUT":
+                self.pending_payouts[transaction_id] = balance.available_balance
+        elif status == "SUCCEEDED":
+            if event_type == "CHARGE":
+                balance = self._balance(account_id)
+                if transaction_id in self.pending_charges:
+                    self.pending_charges.discard(transaction_id)
+                else:
+                    balance.total_balance += amount
+                balance.available_balance += amount
+                self.charge_amounts[transaction_id] = amount
+                delta = amount
+            elif event_type == "REFUND":
+                balance = self._balance(account_id)
+                amount_to_refund = self.charge_amounts[linked_id]
+                balance.total_balance -= amount_to_refund
+                balance.available_balance -= amount_to_refund
+                delta = -amount_to_refund
+            elif event_type == "FEE":
+                balance = self._balance(account_id)
+                balance.total_balance -= amount
+                balance.available_balance -= amount
+                delta = -amount
+            elif event_type == "PAYOUT":
+                delta = 0
+                if transaction_id in self.pending_payouts:
+                    balance = self._balance(account_id)
+                    amount_to_payout = self.pending_payouts.pop(transaction_id)
+                    balance.available_balance -= amount_to_payout
+                    balance.total_balance -= amount_to_payout
+                    delta = -amount_to_payout
+            else:
+                delta = 0
+            self._record_success(account_id, transaction_id, event_type, delta)
+
+    def _record_success(self, account_id: str, transaction_id: str, event_type: str, delta: int) -> None:
+        sequence = self.successful_transactions[account_id]
+        if event_type == "PAYOUT":
+            self.payout_positions[transaction_id] = (account_id, len(sequence))
+            self.payout_boundaries[account_id].append(len(sequence))
+        sequence.append(transaction_id)
+        prefix = self.prefix_amounts.setdefault(account_id, [0])
+        prefix.append(prefix[-1] + delta)
+
+    def payout_statement_range(self, payout_id: str) -> dict:
+        """
+        The slice of the account's success sequence covered by a succeeded
+        payout (everything after the previous payout) and its net amount, in
+        O(log n). Raises KeyError for an unknown payout_id; returns None for a
+        payout that never succeeded, since it settled nothing.
+        """
+        if payout_id not in self.payout_positions:
+            if payout_id not in self.transaction_accounts:
+                raise KeyError(payout_id)
+            return None
+        account_id, end = self.payout_positions[payout_id]
+        boundaries = self.payout_boundaries[account_id]
+        previous = bisect.bisect_left(boundaries, end) - 1
+        start = boundaries[previous] + 1 if previous >= 0 else 0
+        prefix = self.prefix_amounts[account_id]
+        return {
+            "account_id": account_id,
+            "start": start,
+            "end": end,
+            "transaction_count": end - start,
+            "net_amount": prefix[end] - prefix[start]
+        }
+
+    def iter_payout_statement(self, payout_id: str, page_size: int = 1000):
+        """
+        Returns an iterator over the payout's statement transaction ids, one
+        page at a time. An unknown payout_id raises KeyError here, not on the
+        first page; an unsucceeded payout has no pages.
+        """
+        statement = self.payout_statement_range(payout_id)
+        if statement is None:
+            return iter(())
+        sequence = self.successful_transactions[statement["account_id"]]
+        end = statement["end"]
+        return (sequence[page_start:min(page_start + page_size, end)]
+                for page_start in range(statement["start"], end, page_size))
+
+    def replay(self, events: list) -> "LedgerEngine":
+        for event in sorted(events, key=itemgetter(0)):
+            self.apply(event)
+        return self
+
 
 class Ledger:
-    
-    def parse_events(self, logs: str) -> dict:
-        log_tokens = logs.split("|")
-        
-        successful_account_transactions = defaultdict(list)
-        pending_payout_transactions = defaultdict(int)
-        pending_transactions = []
-        account_balance =  defaultdict(lambda: {"available_balance":0, "total_balance": 0})
+
+    def _parse_log(self, logs: str) -> list:
+        """Parses the '|' log into event tuples in input order."""
         events = []
-        successful_account_transactions_to_amount = {}
-        transaction_to_account_mappings = {}
-        
-        for log_token in log_tokens:
-            timestamp,transaction_id,account_id,event_type,amount,status,linked_id = log_token.split(";")
-            events.append({
-                "timestamp": timestamp,
-                "transaction_id": transaction_id,
-                "account_id": account_id,
-                "event_type": event_type,
-                "amount" : int(amount),
-                "status": status,
-                "linked_id": linked_id
-            })
-            transaction_to_account_mappings[transaction_id] = account_id
-        events = sorted(events, key=lambda p:p["timestamp"])
-        
-        for event in events:
-            account_id = event["account_id"]
-            event_type= event["event_type"]
-            amount= event["amount"]
-            status =  event["status"]
-            linked_id = event["linked_id"]
-            transaction_id = event["transaction_id"]
-            if status == "PENDING":
-                if event_type == "CHARGE":
-                    account_balance[account_id]["total_balance"] += amount
-                    pending_transactions.append(transaction_id)
-                elif event_type == "REFUND":
-                    account_balance[account_id]["total_balance"] += amount
-                elif event_type == "FEE":
-                    account_balance[account_id]["total_balance"] -= amount
-                elif event_type == "PAYOUT":
-                     pending_payout_transactions[transaction_id] = account_balance[account_id]["available_balance"]                     
-            elif status == "SUCCEEDED":
-                if event_type == "CHARGE":
-                    if transaction_id not in pending_transactions:
-                        account_balance[account_id]["total_balance"] += amount
-                    else:
-                        pending_transactions.remove(transaction_id)    
-                    account_balance[account_id]["available_balance"] += amount
-                    successful_account_transactions_to_amount[transaction_id] = amount
-                elif event_type == "REFUND":
-                    amount_to_refund = successful_account_transactions_to_amount[linked_id]
-                    account_balance[account_id]["total_balance"] -= amount_to_refund
-                    account_balance[account_id]["available_balance"] -= amount_to_refund
-                elif event_type == "FEE":
-                    account_balance[account_id]["total_balance"] -= amount
-                    account_balance[account_id]["available_balance"] -= amount
-                elif event_type == "PAYOUT":
-                    if transaction_id in pending_payout_transactions:
-                        amount_to_payout = pending_payout_transactions[transaction_id]
-                        account_balance[account_id]["available_balance"] -= amount_to_payout
-                        account_balance[account_id]["total_balance"] -= amount_to_payout
-                        del pending_payout_transactions[transaction_id] 
-                successful_account_transactions[account_id].append(transaction_id)        
-            else:
-                continue
-            
+        for log_token in logs.split("|"):
+            timestamp, transaction_id, account_id, event_type, amount, status, linked_id = log_token.split(";")
+            events.append((timestamp, transaction_id, account_id, event_type, int(amount), status, linked_id))
+        return events
+
+    def _replay(self, logs: str) -> LedgerEngine:
+        return LedgerEngine().replay(self._parse_log(logs))
+
+    def parse_events(self, logs: str) -> dict:
+        engine = self._replay(logs)
         return  {
-            "successful_account_transactions": successful_account_transactions,
-            "account_balance": account_balance,
-            "transaction_to_account_mappings": transaction_to_account_mappings
+            "successful_account_transactions": engine.successful_transactions,
+            "account_balance": {account_id: balance.as_dict() for account_id, balance in engine.balances.items()},
+            "transaction_to_account_mappings": engine.transaction_accounts
             
         }   
     
@@ -128,19 +232,291 @@ class Ledger:
         account_balances = events["account_balance"]
         return account_balances
     
-    def generate_payout_statement(self, log: str, payout_id: str) -> dict:
-        events = self.parse_events(log)
-        transaction_to_account_mappings = events["transaction_to_account_mappings"]
-        successful_account_transactions = events["successful_account_transactions"]
-        successful_transactions_before_payout = []
-        account_id = transaction_to_account_mappings[payout_id]
-        for transaction in successful_account_transactions[account_id]:
-            if transaction == payout_id:
-                return successful_transactions_before_payout
-            successful_transactions_before_payout.append(transaction)
-            
-        return successful_transactions_before_payout
-                    
+    def generate_payout_statement(self, log: str, payout_id: str) -> list:
+        """
+        Successful transactions settled by the payout: those after the
+        account's previous succeeded payout. Raises KeyError for an unknown
+        payout_id and returns [] for a payout that never succeeded.
+        """
+        engine = self._replay(log)
+        statement = []
+        for page in engine.iter_payout_statement(payout_id):
+            statement.extend(page)
+        return statement
+
+
+class LedgerJournal:
+    """
+    Append-only on-disk journal of accepted ledger events.
+
+    Record layout (little-endian), framed so a torn final write is detected
+    and dropped on recovery:
+        u32 body_length
+        body: u8 type, u8 status, i64 amount,
+              then timestamp, transaction_id, account_id, linked_id
+              each as u16 length + UTF-8 bytes
+    """
+
+    EVENT_TYPES = ("CHARGE", "REFUND", "FEE", "PAYOUT")
+    STATUSES = ("SUCCEEDED", "PENDING", "FAILED")
+    _FRAME = struct.Struct("<I")
+    _FIXED = struct.Struct("<BBq")
+    _LENGTH = struct.Struct("<H")
+
+    def __init__(self, path: str):
+        self.path = path
+        self._type_codes = {name: code for code, name in enumerate(self.EVENT_TYPES)}
+        self._status_codes = {name: code for code, name in enumerate(self.STATUSES)}
+        self._file = open(path, "ab")
+
+    def encode(self, event: tuple) -> bytes:
+        timestamp, transaction_id, account_id, event_type, amount, status, linked_id = event
+        if event_type not in self._type_codes or status not in self._status_codes:
+            raise ValueError(f"Cannot journal event {event}")
+        parts = [self._FIXED.pack(self._type_codes[event_type], self._status_codes[status], amount)]
+        for text in (timestamp, transaction_id, account_id, linked_id):
+            data = text.encode()
+            parts.append(self._LENGTH.pack(len(data)))
+            parts.append(data)
+        body = b"".join(parts)
+        return self._FRAME.pack(len(body)) + body
+
+    def decode(self, body: bytes) -> tuple:
+        type_code, status_code, amount = self._FIXED.unpack_from(body, 0)
+        offset = self._FIXED.size
+        texts = []
+        for _ in range(4):
+            (length,) = self._LENGTH.unpack_from(body, offset)
+            offset += self._LENGTH.size
+            texts.append(body[offset:offset + length].decode())
+            offset += length
+        timestamp, transaction_id, account_id, linked_id = texts
+        return (timestamp, transaction_id, account_id, self.EVENT_TYPES[type_code],
+                amount, self.STATUSES[status_code], linked_id)
+
+    def append(self, event: tuple) -> None:
+        self._file.write(self.encode(event))
+
+    def offset(self) -> int:
+        """Byte offset just past the last appended record."""
+        self._file.flush()
+        return self._file.tell()
+
+    def sync(self) -> None:
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def read_from(self, offset: int):
+        """Yields events after `offset`; a truncated trailing record is cut off."""
+        with open(self.path, "rb") as journal:
+            journal.seek(offset)
+            while True:
+                header = journal.read(self._FRAME.size)
+                if len(header) < self._FRAME.size:
+                    break
+                (length,) = self._FRAME.unpack(header)
+                body = journal.read(length)
+                if len(body) < length:
+                    break
+                yield self.decode(body)
+                offset = journal.tell()
+        if offset < os.path.getsize(self.path):
+            self._file.flush()
+            self._file.truncate(offset)
+            # truncate leaves the append handle's position at the old end, which offset() reports
+            self._file.seek(0, os.SEEK_END)
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class DurableLedger:
+    """
+    A long-lived ledger that journals every accepted event and snapshots its
+    full engine state every `snapshot_every` events. On restart it loads the
+    latest snapshot and replays only the journal tail written after it.
+    """
+
+    def __init__(self, directory: str, snapshot_every: int = 100_000):
+        self.snapshot_every = snapshot_every
+        self.snapshot_path = os.path.join(directory, "snapshot.bin")
+        self.journal = LedgerJournal(os.path.join(directory, "journal.bin"))
+        self.engine = LedgerEngine()
+        offset = 0
+        if os.path.exists(self.snapshot_path):
+            with open(self.snapshot_path, "rb") as snapshot:
+                offset, self.engine = pickle.load(snapshot)
+        self.replayed_on_start = 0
+        for event in self.journal.read_from(offset):
+            self.engine.apply(event)
+            self.replayed_on_start += 1
+        self._since_snapshot = self.replayed_on_start
+
+    def append(self, event: tuple) -> None:
+        """
+        Accepts one event: validate, journal, then apply. A rejected event
+        raises before it reaches the journal, so it cannot break replay on
+        restart.
+        """
+        self.engine.validate(event)
+        self.journal.append(event)
+        self.engine.apply(event)
+        self._since_snapshot += 1
+        if self._since_snapshot >= self.snapshot_every:
+            self.snapshot()
+
+    def ingest_log(self, log: str) -> None:
+        """Accepts a '|' log, applied (and journaled) in timestamp order."""
+        for event in sorted(Ledger()._parse_log(log), key=itemgetter(0)):
+            self.append(event)
+
+    def snapshot(self) -> None:
+        """Writes engine state plus the journal offset it covers, atomically."""
+        self.journal.sync()
+        temporary_path = self.snapshot_path + ".tmp"
+        with open(temporary_path, "wb") as snapshot:
+            pickle.dump((self.journal.offset(), self.engine), snapshot, protocol=pickle.HIGHEST_PROTOCOL)
+            snapshot.flush()
+            os.fsync(snapshot.fileno())
+        os.replace(temporary_path, self.snapshot_path)
+        self._since_snapshot = 0
+
+    def generate_payout_statement(self, payout_id: str, page_size: int = 1000):
+        """Streams the payout's statement page by page from the live index."""
+        return self.engine.iter_payout_statement(payout_id, page_size)
+
+    def calculate_final_balances(self) -> dict:
+        return {account_id: balance.available_balance for account_id, balance in self.engine.balances.items()}
+
+    def get_all_balances(self) -> dict:
+        return {account_id: balance.as_dict() for account_id, balance in self.engine.balances.items()}
+
+    def close(self) -> None:
+        self.journal.sync()
+        self.journal.close()
+
+
+class ConcurrentLedger:
+    """
+    Thread-safe ledger for API workers. Accounts are hashed onto `stripes`
+    independent LedgerEngines, each guarded by its own lock, so events for
+    accounts on different stripes never wait on each other. Events for one
+    account must still be applied in timestamp order by the caller.
+    """
+
+    def __init__(self, stripes: int = 64):
+        self._locks = [threading.Lock() for _ in range(stripes)]
+        self._engines = [LedgerEngine() for _ in range(stripes)]
+        self._contended = [0] * stripes  # Only updated while holding that stripe's lock
+
+    def _stripe(self, account_id: str) -> int:
+        return hash(account_id) % len(self._locks)
+
+    def apply(self, event: tuple) -> None:
+        stripe = self._stripe(event[2])
+        lock = self._locks[stripe]
+        if not lock.acquire(blocking=False):
+            lock.acquire()
+            self._contended[stripe] += 1
+        try:
+            self._engines[stripe].apply(event)
+        finally:
+            lock.release()
+
+    def get_balance(self, account_id: str) -> dict:
+        stripe = self._stripe(account_id)
+        with self._locks[stripe]:
+            balance = self._engines[stripe].balances.get(account_id)
+            return None if balance is None else balance.as_dict()
+
+    def get_all_balances(self) -> dict:
+        """
+        Copies one stripe at a time under that stripe's lock, so each account's
+        balances are mutually consistent without ever stopping all writers.
+        """
+        balances = {}
+        for lock, engine in zip(self._locks, self._engines):
+            with lock:
+                for account_id, balance in engine.balances.items():
+                    balances[account_id] = balance.as_dict()
+        return balances
+
+    def calculate_final_balances(self) -> dict:
+        return {account_id: balance["available_balance"] for account_id, balance in self.get_all_balances().items()}
+
+    def contended_acquisitions(self) -> int:
+        return sum(self._contended)
+
+
+def generate_ledger_events(n_events: int, n_accounts: int = 1000, seed: int = 7) -> list:
+    """Synthetic ledger traffic: pending charges that settle, fees, refunds and payouts."""
+    rng = random.Random(seed)
+    events = []
+    pending = []
+    for i in range(n_events):
+        account_id = f"acct_{rng.randrange(n_accounts)}"
+        timestamp = f"{i:012d}"
+        roll = rng.random()
+        if roll < 0.4:
+            amount = rng.randint(100, 10_000)
+            events.append((timestamp, f"ch_{i}", account_id, "CHARGE", amount, "PENDING", ""))
+            pending.append((f"ch_{i}", account_id, amount))
+        elif roll < 0.75 and pending:
+            # Many charges stay pending at once, which made the old list scans quadratic
+            charge_id, charge_account, amount = pending.pop(rng.randrange(len(pending)))
+            events.append((timestamp, charge_id, charge_account, "CHARGE", amount, "SUCCEEDED", ""))
+            if rng.random() < 0.1:
+                events.append((timestamp + "a", f"re_{i}", charge_account, "REFUND", amount, "SUCCEEDED", charge_id))
+        elif roll < 0.9:
+            events.append((timestamp, f"fee_{i}", account_id, "FEE", rng.randint(1, 50), "SUCCEEDED", ""))
+        else:
+            events.append((timestamp, f"po_{i}", account_id, "PAYOUT", 0, "PENDING", ""))
+            events.append((timestamp + "a", f"po_{i}", account_id, "PAYOUT", 0, "SUCCEEDED", ""))
+    rng.shuffle(events)
+    return events
+
+
+def benchmark_replay(*sizes: int) -> None:
+    """Prints replay cost per event; with indexed state it stays flat as the log grows."""
+    print(f"{'events':>12} {'seconds':>9} {'us/event':>9}")
+    for size in sizes:
+        events = generate_ledger_events(size)
+        start = time.perf_counter()
+        LedgerEngine().replay(events)
+        elapsed = time.perf_counter() - start
+        print(f"{len(events):>12} {elapsed:>9.3f} {elapsed / len(events) * 1e6:>9.2f}")
+
+
+def benchmark_contention(threads=(1, 2, 4, 8), skews=(0.0, 0.5, 0.9), n_events: int = 200_000) -> None:
+    """
+    Applies succeeded charges and fees from several threads. `skew` is the share
+    of traffic sent to one hot account; the rest is spread over 10k accounts.
+    """
+    print(f"{'threads':>7} {'skew':>5} {'events/s':>10} {'contended':>10}")
+    for skew in skews:
+        rng = random.Random(11)
+        events = []
+        for i in range(n_events):
+            account_id = "acct_hot" if rng.random() < skew else f"acct_{rng.randrange(10_000)}"
+            if rng.random() < 0.8:
+                events.append((f"{i:012d}", f"ch_{i}", account_id, "CHARGE", rng.randint(100, 10_000), "SUCCEEDED", ""))
+            else:
+                events.append((f"{i:012d}", f"fee_{i}", account_id, "FEE", rng.randint(1, 50), "SUCCEEDED", ""))
+
+        for thread_count in threads:
+            ledger = ConcurrentLedger()
+            # Succeeded charges and fees commute, so round-robin is safe here and
+            # lets every thread hit the hot account.
+            chunks = [events[offset::thread_count] for offset in range(thread_count)]
+            workers = [threading.Thread(target=lambda chunk=chunk: [ledger.apply(e) for e in chunk]) for chunk in chunks]
+            start = time.perf_counter()
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+            elapsed = time.perf_counter() - start
+            print(f"{thread_count:>7} {skew:>5.1f} {n_events / elapsed:>10.0f} {ledger.contended_acquisitions():>10}")
+
 
 if __name__ == "__main__":
  
@@ -167,4 +543,46 @@ if __name__ == "__main__":
     print("--- Part 2")
     print(dict(ledger.get_all_balances(log)))
     print("--- Part 3")
-    print(ledger.generate_payout_statement(log, 'po_A1'))      
\ No newline at end of file
+    print(ledger.generate_payout_statement(log, 'po_A1'))
+    # Expected: tx_A1, tx_A2 and tx_A3 net to 1000 - 50 + 300 = 1250
+    print(ledger._replay(log).payout_statement_range('po_A1'))
+
+    print("--- Durable Journal: Restart Replays Only the Tail")
+    with tempfile.TemporaryDirectory() as directory:
+        durable = DurableLedger(directory, snapshot_every=10)
+        durable.ingest_log(log)
+        durable.close()
+        restarted = DurableLedger(directory, snapshot_every=10)
+        # Expected: 14 events, snapshot after 10, so 4 replayed from the journal
+        print(restarted.replayed_on_start, restarted.get_all_balances() == dict(ledger.get_all_balances(log)))
+        restarted.close()
+
+    print("--- Durable Journal: Snapshot After Torn-Tail Recovery")
+    with tempfile.TemporaryDirectory() as directory:
+        durable = DurableLedger(directory)
+        for i in range(5):
+            durable.append((f"2025-01-01T00:00:0{i}Z", f"ch_{i}", "acct_T", "CHARGE", 10, "SUCCEEDED", ""))
+        durable.close()
+        journal_path = os.path.join(directory, "journal.bin")
+        os.truncate(journal_path, os.path.getsize(journal_path) - 3)
+        recovered = DurableLedger(directory)
+        recovered.snapshot()
+        recovered.append(("2025-01-01T00:00:09Z", "ch_9", "acct_T", "CHARGE", 7, "SUCCEEDED", ""))
+        recovered.close()
+        restarted = DurableLedger(directory)
+        # Expected: 1 event replayed after the snapshot, balance 4 * 10 + 7 = 47
+        print(restarted.replayed_on_start, restarted.calculate_final_balances()["acct_T"])
+        restarted.close()
+
+    print("--- Concurrent Ledger")
+    concurrent_ledger = ConcurrentLedger(stripes=4)
+    for event in sorted(ledger._parse_log(log), key=itemgetter(0)):
+        concurrent_ledger.apply(event)
+    print(concurrent_ledger.get_all_balances() == dict(ledger.get_all_balances(log)))
+
+    if "--contention" in sys.argv:
+        benchmark_contention()
+
+    if "--benchmark" in sys.argv:
+        sizes = [int(arg) for arg in sys.argv[sys.argv.index("--benchmark") + 1:]]
+        benchmark_replay(*(sizes or [10_000, 100_000, 1_000_000]))      
\ No newline at end of file
@@ -30,6 +30,13 @@ Part 4: Currency-Specific Reporting
 """
 from collections import defaultdict
 
+try:
+    import numpy as np
+except ImportError:  # The vectorized backend is optional
+    np = None
+
+from result_cache import ResultCache
+
 # ===================================================================================
 # User's Approach
 #
@@ -131,6 +138,10 @@ class FeeCalculator:
 # report. This approach is more efficient, easier to maintain, and less prone
 # ===================================================================================
 class ConnectFeeCalculator:
+    def __init__(self, result_cache: ResultCache = None):
+        # Optional multi-entry cache; without one, only the last log is memoized.
+        self.result_cache = result_cache
+
     def _parse_log(self, log: str) -> list:
         """Parses the raw string into a clean list of charge objects."""
         charges = []
@@ -151,11 +162,21 @@ class ConnectFeeCalculator:
         return charges
 
     def _process_all_charges(self, log: str) -> dict:
-        """The core processing engine. Loops once to calculate all required values."""
+        """Returns the report for `log`, computing it only on a cache miss."""
+        if self.result_cache is not None:
+            return self.result_cache.get_or_compute(type(self).__name__, log, self._build_report)
+
         # Memoization: If we've processed this exact log before, return the cached result.
         if hasattr(self, '_cached_report') and self._cached_log == log:
             return self._cached_report
 
+        # Cache the result and return
+        self._cached_log = log
+        self._cached_report = self._build_report(log)
+        return self._cached_report
+
+    def _build_report(self, log: str) -> dict:
+        """The core processing engine. Loops once to calculate all required values."""
         charges = self._parse_log(log)
         
         # This single report object will hold the answers to all parts.
@@ -190,9 +211,6 @@ class ConnectFeeCalculator:
             currency_report_for_acct["gross_volume"] += amount
             currency_report_for_acct["net_payout"] += amount - differentiated_fee
 
-        # Cache the result and return
-        self._cached_log = log
-        self._cached_report = report
         return report
 
     def calculate_gross_volume(self, log: str) -> dict:
@@ -216,6 +234,95 @@ class ConnectFeeCalculator:
         # Convert nested defaultdicts to regular dicts for cleaner output
         return {acct: dict(currencies) for acct, currencies in final_report["currency_report"].items()}
 
+# ===================================================================================
+# Vectorized Backend (optional, requires NumPy)
+#
+# Same report as `ConnectFeeCalculator`, but the log is parsed into typed
+# columns (account index, int64 amount, currency index, DIRECT flag) and every
+# fee and per-group total is computed with whole-array operations. Fees use
+# integer floor division and sums stay in int64, so the results are identical
+# to the pure-Python integer math.
+# ===================================================================================
+class VectorizedFeeCalculator(ConnectFeeCalculator):
+    def __init__(self, result_cache: ResultCache = None):
+        if np is None:
+            raise ImportError("VectorizedFeeCalculator requires numpy")
+        super().__init__(result_cache)
+
+    def _parse_columns(self, log: str) -> tuple:
+        """Parses the raw string into column arrays plus the account/currency names."""
+        account_ids = {}
+        currency_codes = {}
+        accounts, amounts, currencies, is_direct = [], [], [], []
+        for charge_str in log.strip().split('~'):
+            if not charge_str:
+                continue
+            try:
+                _, acct_id, amount, currency, charge_type = charge_str.split(';')
+                amount = int(amount)
+            except (ValueError, IndexError):
+                continue
+            # Indices are handed out in first-seen order, which keeps the output
+            # dicts in the same order as the pure-Python engine.
+            accounts.append(account_ids.setdefault(acct_id, len(account_ids)))
+            currencies.append(currency_codes.setdefault(currency, len(currency_codes)))
+            amounts.append(amount)
+            is_direct.append(charge_type == "DIRECT")
+
+        columns = (
+            np.array(accounts, dtype=np.int64),
+            np.array(amounts, dtype=np.int64),
+            np.array(currencies, dtype=np.int64),
+            np.array(is_direct, dtype=bool),
+        )
+        return columns, list(account_ids), list(currency_codes)
+
+    def _group_sum(self, keys, values, size: int):
+        """Exact int64 group-by sum (sort + reduceat, no float round-trip)."""
+        totals = np.zeros(size, dtype=np.int64)
+        if len(keys) == 0:
+            return totals
+        order = np.argsort(keys, kind="stable")
+        sorted_keys = keys[order]
+        starts = np.concatenate(([0], np.flatnonzero(np.diff(sorted_keys)) + 1))
+        totals[sorted_keys[starts]] = np.add.reduceat(values[order], starts)
+        return totals
+
+    def _build_report(self, log: str) -> dict:
+        (accounts, amounts, currencies, is_direct), account_names, currency_names = self._parse_columns(log)
+        n_accounts = len(account_names)
+        n_currencies = len(currency_names)
+
+        flat_net = amounts - (amounts * 2) // 100
+        differentiated_net = amounts - np.where(is_direct, (amounts * 5) // 1000, (amounts * 2) // 100)
+
+        gross = self._group_sum(accounts, amounts, n_accounts).tolist()
+        flat = self._group_sum(accounts, flat_net, n_accounts).tolist()
+        differentiated = self._group_sum(accounts, differentiated_net, n_accounts).tolist()
+
+        # Part 4 groups by (account, currency); visit the groups in first-seen
+        # order so the nested dicts come out ordered like the Python engine.
+        pair_keys = accounts * n_currencies + currencies
+        pair_gross = self._group_sum(pair_keys, amounts, n_accounts * n_currencies)
+        pair_net = self._group_sum(pair_keys, differentiated_net, n_accounts * n_currencies)
+        unique_pairs, first_seen = np.unique(pair_keys, return_index=True)
+        currency_report = {}
+        for pair in unique_pairs[np.argsort(first_seen)].tolist():
+            account, currency = divmod(pair, n_currencies)
+            currency_report.setdefault(account_names[account], {})[currency_names[currency]] = {
+                "gross_volume": int(pair_gross[pair]),
+                "net_payout": int(pair_net[pair])
+            }
+
+        report = {
+            "gross_volume": dict(zip(account_names, gross)),
+            "net_payout_flat": dict(zip(account_names, flat)),
+            "net_payout_differentiated": dict(zip(account_names, differentiated)),
+            "currency_report": currency_report
+        }
+        return report
+
+
 if __name__ == "__main__":
     log_data = (
         "tx_1;acct_1;10000;USD;DESTINATION~"
@@ -238,4 +345,18 @@ if __name__ == "__main__":
     print(calculator.calculate_net_payouts_differentiated(log_data))
 
     print("\n## Part 4: Currency-Specific Reporting ##")
-    print(calculator.generate_currency_report(log_data))
\ No newline at end of file
+    print(calculator.generate_currency_report(log_data))
+
+    if np is not None:
+        print("\n## Vectorized Backend Matches ##")
+        vectorized = VectorizedFeeCalculator()
+        print(vectorized.generate_currency_report(log_data) == calculator.generate_currency_report(log_data))
+
+    print("\n## Shared Result Cache ##")
+    cache = ResultCache(max_entries=8)
+    cached_calculator = ConnectFeeCalculator(result_cache=cache)
+    other_log = "tx_5;acct_3;1000;EUR;DIRECT"
+    for current_log in (log_data, other_log, log_data, other_log):
+        cached_calculator.calculate_gross_volume(current_log)
+    # Expected: two misses, then alternating logs are both hits
+    print(cache.stats())
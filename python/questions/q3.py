@@ -32,6 +32,9 @@ invoices = [
 Expected Output:
 payment5 pays off 1000 for invoiceC due on 2023-01-30 """
 
+import bisect
+
+
 class Invoice:
     
     def parse_input(self, payment: str, invoices: list) -> str:
@@ -91,6 +94,103 @@ class Invoice:
             
         
     
+class InvoiceMatchIndex:
+    """
+    Prebuilt matching index over the open invoices:
+    - a hash map from invoice_id for memo ("Paying off: {INVOICE_ID}") hits,
+    - a sorted (amount, due_date) array searched with bisect for exact and
+      ±forgiveness matches, preferring the closest amount and then the
+      earliest due date.
+    Each invoice is paid at most once. Paid slots are skipped with two
+    path-compressed "next free" pointer arrays, so a batch of N payments
+    against M invoices costs O((N + M) log M) instead of O(N * M).
+    """
+
+    def __init__(self, invoices: list):
+        entries = []
+        for position, invoice in enumerate(invoices):
+            invoice_id, due_date, amount = (token.strip() for token in invoice.split(","))
+            entries.append((int(amount), due_date, position, invoice_id))
+        entries.sort()
+        self.amounts = [entry[0] for entry in entries]
+        self.due_dates = [entry[1] for entry in entries]
+        self.invoice_ids = [entry[3] for entry in entries]
+        self.slot_by_id = {invoice_id: slot for slot, invoice_id in enumerate(self.invoice_ids)}
+        # _right[i]: first free slot >= i (len = none); _left[i + 1]: last free slot <= i (0 = none)
+        self._right = list(range(len(entries) + 1))
+        self._left = list(range(len(entries) + 1))
+
+    def _find(self, parent: list, slot: int) -> int:
+        root = slot
+        while parent[root] != root:
+            root = parent[root]
+        while parent[slot] != root:
+            parent[slot], slot = root, parent[slot]
+        return root
+
+    def _free_at_or_after(self, slot: int) -> int:
+        return self._find(self._right, slot)
+
+    def _free_at_or_before(self, slot: int) -> int:
+        return self._find(self._left, slot + 1) - 1
+
+    def _consume(self, slot: int) -> None:
+        self._right[slot] = slot + 1
+        self._left[slot + 1] = slot
+
+    def _closest_slot(self, amount: int, forgiveness: int):
+        start = bisect.bisect_left(self.amounts, amount)
+        candidates = []
+        above = self._free_at_or_after(start)
+        if above < len(self.amounts):
+            candidates.append(above)
+        below = self._free_at_or_before(start - 1)
+        if below >= 0:
+            # Earliest-due free invoice with that same amount
+            candidates.append(self._free_at_or_after(bisect.bisect_left(self.amounts, self.amounts[below])))
+        best = None
+        for slot in candidates:
+            key = (abs(self.amounts[slot] - amount), self.due_dates[slot])
+            if key[0] <= forgiveness and (best is None or key < best[0]):
+                best = (key, slot)
+        return None if best is None else best[1]
+
+    def match_payment(self, payment: str, forgiveness: int = 0):
+        """Matches one "payment_id,amount,memo" string; returns a match dict or None."""
+        payment_id, amount, memo = (token.strip() for token in payment.split(",", 2))
+        amount = int(amount)
+        slot = None
+        if memo.startswith("Paying off:"):
+            memo_slot = self.slot_by_id.get(memo.split(":", 1)[1].strip())
+            if memo_slot is not None and self._free_at_or_after(memo_slot) == memo_slot:
+                slot = memo_slot
+        if slot is None:
+            slot = self._closest_slot(amount, forgiveness)
+        if slot is None:
+            return None
+        self._consume(slot)
+        return {
+            "payment_id": payment_id,
+            "amount": amount,
+            "memo": memo,
+            "invoice_id": self.invoice_ids[slot],
+            "due_date": self.due_dates[slot],
+            "forgiven": abs(amount - self.amounts[slot])
+        }
+
+    def match_many(self, payments: list, forgiveness: int = 0) -> list:
+        """Matches payments in order; each invoice is used at most once."""
+        return [self.match_payment(payment, forgiveness) for payment in payments]
+
+    def describe(self, match: dict) -> str:
+        if match is None:
+            return ""
+        line = f"{match['payment_id']} pays off {match['amount']} for {match['invoice_id']} due to {match['due_date']} by {match['memo']}"
+        if match["forgiven"]:
+            line += f" with forgiveness {match['forgiven']}"
+        return line
+
+
 if __name__ == "__main__":
                     
     invoice = Invoice()
@@ -112,4 +212,12 @@ if __name__ == "__main__":
     forgiveness = 300
     print(invoice.parse_with_forgiveness(payment1, invoices1, forgiveness))         
             
-         
\ No newline at end of file
+         
+
+    print(" batch index")
+    index = InvoiceMatchIndex(invoices1)
+    # Expected: the 700 payment takes invoiceA (900, forgiven 200); the next 1000
+    # payment takes invoiceC (due earliest), then invoiceB; the last finds nothing left
+    payments = ["payment5,700,Bank transfer", "payment6,1000,Wire", "payment7,1000,Wire", "payment8,1000,Wire"]
+    for match in index.match_many(payments, forgiveness):
+        print(index.describe(match) or "no match")
@@ -52,7 +52,14 @@ TOTAL
   USD: 800
 """
 
+import bisect
+import hashlib
+import heapq
+import io
+import itertools
+import math
 from collections import defaultdict
+from datetime import date
 
 class Transactions:
     
@@ -162,6 +169,292 @@ class Transactions:
         return ans
                      
                 
+class WindowedDedup:
+    """
+    Remembers transaction ids for a sliding window of hourly buckets only, so
+    memory stays bounded on logs of any length. Ids whose bucket has fallen
+    `window_hours` or more behind the newest bucket are forgotten; a
+    duplicate arriving later than that is no longer caught.
+    """
+
+    def __init__(self, window_hours: int = 24):
+        self.window_hours = window_hours
+        self.seen = {}              # transaction_id -> hour bucket it was seen in
+        self.buckets = {}           # hour bucket -> ids first seen in that hour
+        self.bucket_heap = []       # hour buckets, oldest on top
+        self.newest = None
+        self.peak_tracked = 0
+        self._day = (None, 0)
+
+    def _hour_number(self, timestamp: str) -> int:
+        day = timestamp[:10]
+        if day != self._day[0]:
+            self._day = (day, date.fromisoformat(day).toordinal() * 24)
+        return self._day[1] + int(timestamp[11:13])
+
+    def _expire(self) -> None:
+        while self.bucket_heap and self.bucket_heap[0] <= self.newest - self.window_hours:
+            for transaction_id in self.buckets.pop(heapq.heappop(self.bucket_heap)):
+                del self.seen[transaction_id]
+
+    def is_duplicate(self, transaction_id: str, timestamp: str) -> bool:
+        if transaction_id in self.seen:
+            return True
+        hour = self._hour_number(timestamp)
+        if self.newest is None or hour > self.newest:
+            self.newest = hour
+            self._expire()
+        if hour not in self.buckets:
+            self.buckets[hour] = []
+            heapq.heappush(self.bucket_heap, hour)
+        self.buckets[hour].append(transaction_id)
+        self.seen[transaction_id] = hour
+        self.peak_tracked = max(self.peak_tracked, len(self.seen))
+        return False
+
+
+class ScalableBloomFilter:
+    """
+    Bloom filter that grows by adding stages. Stage i holds
+    `initial_capacity * growth**i` items at an error rate tightened by
+    `tightening**i`, so the overall false-positive rate stays under
+    `error_rate` however many ids arrive.
+    """
+
+    def __init__(self, initial_capacity: int = 1 << 16, error_rate: float = 0.001,
+                 growth: int = 2, tightening: float = 0.5):
+        self.initial_capacity = initial_capacity
+        self.error_rate = error_rate
+        self.growth = growth
+        self.tightening = tightening
+        self.stages = []  # [bits, n_bits, n_hashes, capacity, count]
+        self._add_stage()
+
+    def _add_stage(self) -> None:
+        index = len(self.stages)
+        capacity = self.initial_capacity * self.growth ** index
+        stage_error = self.error_rate * (1 - self.tightening) * self.tightening ** index
+        n_bits = math.ceil(-capacity * math.log(stage_error) / math.log(2) ** 2)
+        n_hashes = max(1, round(n_bits / capacity * math.log(2)))
+        self.stages.append([bytearray((n_bits + 7) // 8), n_bits, n_hashes, capacity, 0])
+
+    def _hashes(self, item: str) -> tuple:
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        return int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little") | 1
+
+    def _contains(self, stage: list, first: int, second: int) -> bool:
+        bits, n_bits, n_hashes = stage[0], stage[1], stage[2]
+        for i in range(n_hashes):
+            position = (first + i * second) % n_bits
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+    def add_if_absent(self, item: str) -> bool:
+        """Adds `item`; returns True if it was (probably) already present."""
+        first, second = self._hashes(item)
+        for stage in self.stages:
+            if self._contains(stage, first, second):
+                return True
+        stage = self.stages[-1]
+        if stage[4] >= stage[3]:
+            self._add_stage()
+            stage = self.stages[-1]
+        bits, n_bits = stage[0], stage[1]
+        for i in range(stage[2]):
+            position = (first + i * second) % n_bits
+            bits[position >> 3] |= 1 << (position & 7)
+        stage[4] += 1
+        return False
+
+    def memory_bytes(self) -> int:
+        return sum(len(stage[0]) for stage in self.stages)
+
+
+class StreamingReconciler:
+    """
+    Single-pass reconciliation. The ',' log is read lazily (from a string or
+    a file object, chunk by chunk), each transaction is deduplicated through a
+    WindowedDedup and added straight into per-merchant, per-currency totals.
+    Nothing per transaction is kept beyond the dedup window.
+    """
+
+    def __init__(self, dedup_window_hours: int = 24, chunk_size: int = 1 << 20):
+        self.dedup_window_hours = dedup_window_hours
+        self.chunk_size = chunk_size
+        self.last_dedup = None
+
+    def _iter_tokens(self, source):
+        if isinstance(source, str):
+            start = 0
+            while start <= len(source):
+                end = source.find(",", start)
+                if end == -1:
+                    end = len(source)
+                yield source[start:end]
+                start = end + 1
+            return
+        pending = ""
+        while True:
+            chunk = source.read(self.chunk_size)
+            if not chunk:
+                break
+            tokens = (pending + chunk).split(",")
+            pending = tokens.pop()
+            yield from tokens
+        yield pending
+
+    def iter_transactions(self, source):
+        """Yields (transaction_id, merchant_id, currency, amount, type, timestamp) lazily."""
+        for token in self._iter_tokens(source):
+            token = token.strip()
+            if not token:
+                continue
+            transaction_id, merchant_id, currency, amount, event_type, timestamp = token.split(":", 5)
+            yield transaction_id, merchant_id, currency, int(amount), event_type, timestamp
+
+    def reconcile(self, source, cutoff_date: str = None, dedup: bool = True) -> dict:
+        """
+        Earnings per merchant and currency (currencies sorted), optionally only
+        for transactions on or before `cutoff_date` and only unique ids.
+        """
+        totals = defaultdict(lambda: defaultdict(int))
+        dedup_window = WindowedDedup(self.dedup_window_hours) if dedup else None
+        for transaction_id, merchant_id, currency, amount, _, timestamp in self.iter_transactions(source):
+            if cutoff_date is not None and timestamp[:10] > cutoff_date:
+                continue
+            if dedup_window is not None and dedup_window.is_duplicate(transaction_id, timestamp):
+                continue
+            totals[merchant_id][currency] += amount
+        self.last_dedup = dedup_window
+        return {merchant_id: dict(sorted(currencies.items())) for merchant_id, currencies in totals.items()}
+
+    def reconcile_approximate(self, source, cutoff_date: str = None, error_rate: float = 0.001,
+                              verify: bool = True, initial_capacity: int = 1 << 16) -> tuple:
+        """
+        Approximate dedup for id sets too large for memory. Pass one dedups
+        through a ScalableBloomFilter; a hit is only a *suspected* duplicate
+        and is left out. With `verify`, a second pass over the log (a string
+        or a seekable file) looks only at the suspected ids: if an id's first
+        occurrence was itself flagged, it was a false positive and its amount
+        is added back. Returns (totals, stats).
+        """
+        bloom = ScalableBloomFilter(initial_capacity, error_rate)
+        totals = defaultdict(lambda: defaultdict(int))
+        first_flagged = {}  # suspected id -> position of its first flagged occurrence
+        checked = 0
+
+        def in_cutoff(transactions):
+            for transaction in transactions:
+                if cutoff_date is None or transaction[5][:10] <= cutoff_date:
+                    yield transaction
+
+        for position, (transaction_id, merchant_id, currency, amount, _, _) in enumerate(in_cutoff(self.iter_transactions(source))):
+            checked += 1
+            if bloom.add_if_absent(transaction_id):
+                first_flagged.setdefault(transaction_id, position)
+            else:
+                totals[merchant_id][currency] += amount
+
+        stats = {
+            "transactions": checked,
+            "suspected_duplicates": len(first_flagged),
+            "bloom_bytes": bloom.memory_bytes(),
+            "false_positives": None,
+            "measured_fp_rate": None
+        }
+        if verify and first_flagged:
+            if not isinstance(source, str):
+                source.seek(0)
+            false_positives = 0
+            pending = dict(first_flagged)
+            for position, (transaction_id, merchant_id, currency, amount, _, _) in enumerate(in_cutoff(self.iter_transactions(source))):
+                flagged_at = pending.pop(transaction_id, None)
+                if flagged_at == position:
+                    # Its first occurrence was flagged, so nothing was counted for it
+                    totals[merchant_id][currency] += amount
+                    false_positives += 1
+                if not pending:
+                    break
+            unique = checked - len(first_flagged) + false_positives
+            stats["false_positives"] = false_positives
+            stats["measured_fp_rate"] = false_positives / unique if unique else 0.0
+        totals = {merchant_id: dict(sorted(currencies.items())) for merchant_id, currencies in totals.items()}
+        return totals, stats
+
+    def generate_reconciliation_report(self, source, cutoff_date: str) -> str:
+        return format_reconciliation_report(self.reconcile(source, cutoff_date), cutoff_date)
+
+
+class DailyRollups:
+    """
+    Per-(merchant, currency) daily totals with cumulative prefix sums, built
+    in one pass over the log. A cutoff query is then a binary search over each
+    series' days plus a prefix-sum lookup, instead of a rescan of the log.
+    Duplicates are removed exactly by default, keeping the earliest-dated copy
+    of each id wherever it sits in the log, or through a WindowedDedup (first
+    copy in log order) when `dedup_window_hours` is given.
+    """
+
+    def __init__(self, source, dedup_window_hours: int = None):
+        transactions = StreamingReconciler().iter_transactions(source)
+        if dedup_window_hours is None:
+            earliest = {}  # transaction_id -> (merchant_id, currency, amount, timestamp)
+            for transaction_id, merchant_id, currency, amount, _, timestamp in transactions:
+                kept = earliest.get(transaction_id)
+                if kept is None or timestamp < kept[3]:
+                    earliest[transaction_id] = (merchant_id, currency, amount, timestamp)
+            rows = earliest.values()
+        else:
+            dedup = WindowedDedup(dedup_window_hours)
+            rows = ((merchant_id, currency, amount, timestamp)
+                    for transaction_id, merchant_id, currency, amount, _, timestamp in transactions
+                    if not dedup.is_duplicate(transaction_id, timestamp))
+
+        daily = defaultdict(lambda: defaultdict(int))
+        for merchant_id, currency, amount, timestamp in rows:
+            daily[(merchant_id, currency)][timestamp[:10]] += amount
+
+        self.days = {}
+        self.prefix_sums = {}
+        for series, totals in sorted(daily.items()):
+            days = sorted(totals)
+            prefix = list(itertools.accumulate(totals[day] for day in days))
+            self.days[series] = days
+            self.prefix_sums[series] = prefix
+
+    def totals_as_of(self, cutoff_date: str) -> dict:
+        """Earnings per merchant and currency for transactions on or before the cutoff."""
+        totals = {}
+        for series, days in self.days.items():
+            index = bisect.bisect_right(days, cutoff_date)
+            if index:
+                merchant_id, currency = series
+                totals.setdefault(merchant_id, {})[currency] = self.prefix_sums[series][index - 1]
+        return totals
+
+    def generate_reconciliation_report(self, cutoff_date: str) -> str:
+        return format_reconciliation_report(self.totals_as_of(cutoff_date), cutoff_date)
+
+
+def format_reconciliation_report(totals: dict, cutoff_date: str) -> str:
+    """Formats Part 4's report from {merchant: {currency: amount}} totals."""
+    lines = [f"Reconciliation Report for {cutoff_date}"]
+    grand_total = defaultdict(int)
+    for merchant_id in sorted(totals):
+        lines.append("")
+        lines.append(f"Merchant: {merchant_id}")
+        for currency in sorted(totals[merchant_id]):
+            amount = totals[merchant_id][currency]
+            lines.append(f"  {currency}: {amount}")
+            grand_total[currency] += amount
+    lines.append("")
+    lines.append("TOTAL")
+    for currency in sorted(grand_total):
+        lines.append(f"  {currency}: {grand_total[currency]}")
+    return "\n".join(lines)
+
+
 if __name__ == "__main__":
     log = (
         "txn1:m1:USD:1000:PAYMENT:2025-06-24T10:00:00Z,"
@@ -177,4 +470,16 @@ if __name__ == "__main__":
     print(dict(transactions.get_transactions_with_cutoff_date(log,cutoff_date)))
     print(dict(transactions.get_transactions_with_unique_transactions(log, cutoff_date)))
     print(transactions.generate_reconciliation_report(log, cutoff_date))
-                  
\ No newline at end of file
+                  
+
+    streaming = StreamingReconciler(dedup_window_hours=24)
+    print(streaming.reconcile(log, cutoff_date))
+    print(streaming.generate_reconciliation_report(io.StringIO(log), cutoff_date))
+    print(f"peak tracked ids: {streaming.last_dedup.peak_tracked}")
+
+    rollups = DailyRollups(log)
+    for cutoff in ("2025-06-23", "2025-06-24", "2025-06-25"):
+        print(cutoff, rollups.totals_as_of(cutoff))
+
+    approximate, stats = streaming.reconcile_approximate(log, cutoff_date, error_rate=0.01)
+    print(approximate, stats)
@@ -21,71 +21,125 @@ Make sure to sort the events before doing anything
 
 """
 
-from collections import defaultdict
-from datetime import datetime
+from collections import OrderedDict, defaultdict
+from datetime import date, datetime
+
+try:
+    import numpy as np
+except ImportError:  # The offline sweep is optional
+    np = None
+
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+class LeakyBucketLimiter:
+    """
+    Long-lived leaky-bucket limiter. Each api_key keeps a compact
+    [level, last_update_epoch] record; `check` leaks it lazily for the time
+    elapsed since the last request, so every decision is O(1).
+
+    Records are kept in least-recently-used order. A bucket that has fully
+    drained is indistinguishable from a new one, so idle keys at the front
+    are evicted as they drain (or once idle longer than `idle_ttl` seconds).
+
+    With a `store` (a StateStore from part_2/state_store.py), buckets live in
+    the store instead, so every worker process shares one bucket per key.
+    """
+
+    def __init__(self, bucket_capacity: float, leak_rate_per_second: float, idle_ttl: float = None, store=None):
+        self.bucket_capacity = bucket_capacity
+        self.leak_rate_per_second = leak_rate_per_second
+        self.idle_ttl = idle_ttl
+        self.store = store
+        self._buckets = OrderedDict()  # api_key -> [level, last_update_epoch]
+
+    def check_many(self, requests: list) -> list:
+        """Decides (api_key, size, now) requests in order; a store gets them as one pipeline."""
+        if self.store is None:
+            return [self.check(api_key, size, now) for api_key, size, now in requests]
+        return self.store.execute([["leak", api_key, size, now, self.bucket_capacity, self.leak_rate_per_second]
+                                   for api_key, size, now in requests])
+
+    def check(self, api_key: str, size: float, now: float) -> bool:
+        """Returns True (and adds `size`) if the request fits in the bucket at `now`."""
+        if self.store is not None:
+            return self.store.leak(api_key, size, now, self.bucket_capacity, self.leak_rate_per_second)
+        record = self._buckets.get(api_key)
+        if record is None:
+            record = self._buckets[api_key] = [0.0, now]
+        else:
+            self._buckets.move_to_end(api_key)
+            # Clamp so a slightly out-of-order request never refills the bucket
+            elapsed = now - record[1]
+            if elapsed > 0:
+                record[0] = max(0.0, record[0] - elapsed * self.leak_rate_per_second)
+                record[1] = now
+
+        accepted = record[0] + size <= self.bucket_capacity
+        if accepted:
+            record[0] += size
+        self._evict_idle(now)
+        return accepted
+
+    def _evict_idle(self, now: float) -> None:
+        while self._buckets:
+            api_key, (level, last_update) = next(iter(self._buckets.items()))
+            idle = now - last_update
+            drained = idle * self.leak_rate_per_second >= level
+            if not drained and (self.idle_ttl is None or idle < self.idle_ttl):
+                break
+            self._buckets.popitem(last=False)
+
+    def level(self, api_key: str, now: float) -> float:
+        record = self._buckets.get(api_key)
+        if record is None:
+            return 0.0
+        return max(0.0, record[0] - max(0.0, now - record[1]) * self.leak_rate_per_second)
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
 class LeakyBucket:
-    
-    def parse_events(self, request_logs: str, leak_rate_per_second: int, bucket_capacity: int) -> dict:
-        api_map = defaultdict(dict)
-        request_map = defaultdict(list)
-        
-        request_logs_tokens = request_logs .split("~")
-        buckets = defaultdict(lambda: {"current_size": 0.0, "last_updated_time": None})
-        
+
+    def _parse_timestamp(self, timestamp_str: str) -> tuple:
+        """Returns (epoch_seconds, normalized_timestamp, minute) for one log timestamp."""
+        if len(timestamp_str) == 20 and timestamp_str[10] == "T" and timestamp_str[-1] == "Z":
+            # Fast path for the log's fixed YYYY-MM-DDTHH:MM:SSZ format
+            day = timestamp_str[:10]
+            if day not in self._day_epochs:
+                self._day_epochs[day] = (date.fromisoformat(day).toordinal() - _EPOCH_ORDINAL) * 86400
+            epoch = (self._day_epochs[day] + int(timestamp_str[11:13]) * 3600
+                     + int(timestamp_str[14:16]) * 60 + int(timestamp_str[17:19]))
+            return epoch, timestamp_str, timestamp_str[14:16]
+        parsed = datetime.fromisoformat(timestamp_str.replace('Z', '+00:00'))
+        return parsed.timestamp(), parsed.isoformat().replace('+00:00', 'Z'), parsed.strftime('%M')
+
+    def _parse_log(self, request_logs: str) -> list:
+        """Parses the '~' log into (epoch, timestamp, minute, api_key, request_id, size), sorted by time."""
+        self._day_epochs = {}
         all_events = []
         for request_logs_token in request_logs.strip().split("~"):
             try:
                 timestamp_str, api_key, request_id, size = request_logs_token.split(";")
-                all_events.append({
-                    "timestamp": datetime.fromisoformat(timestamp_str.replace('Z', '+00:00')),
-                    "api_key": api_key,
-                    "request_id": request_id,
-                    "size": int(size)
-                })
+                epoch, timestamp, minute = self._parse_timestamp(timestamp_str)
+                all_events.append((epoch, timestamp, minute, api_key, request_id, int(size)))
             except (ValueError, IndexError):
                 continue
+        all_events.sort(key=lambda e: e[0])
+        return all_events
 
-        # --- FIX: Step 2 - Sort events to process them chronologically ---
-        sorted_events = sorted(all_events, key=lambda e: e["timestamp"])
+    def parse_events(self, request_logs: str, leak_rate_per_second: int, bucket_capacity: int) -> dict:
+        limiter = LeakyBucketLimiter(bucket_capacity, leak_rate_per_second)
         api_map = defaultdict(lambda: defaultdict(list))
-
-        for event in sorted_events:
-            api_key = event["api_key"]
-            current_time = event["timestamp"]
-            
-            # Initialize the bucket's time on its first request.
-            if buckets[api_key]["last_updated_time"] is None:
-                buckets[api_key]["last_updated_time"] = current_time
-
-            # --- FIX: Step 4 - Calculate leak based on TIME ELAPSED ---
-            time_delta = (current_time - buckets[api_key]["last_updated_time"]).total_seconds()
-            leaked_amount = time_delta * leak_rate_per_second
-            
-            current_size = buckets[api_key]["current_size"]
-            new_size_after_leak = max(0, current_size - leaked_amount)
-            
-            # This is the event object that will be stored.
-            event_output = {
-                "request_id": event["request_id"],
-                "size": event["size"],
-                "timestamp": event["timestamp"].isoformat().replace('+00:00', 'Z'),
-            }
-
-            # Check if the new request fits.
-            if new_size_after_leak + event["size"] <= bucket_capacity:
-                event_output["status"] = "ACCEPTED"
-                buckets[api_key]["current_size"] = new_size_after_leak + event["size"]
-            else:
-                event_output["status"] = "REJECTED"
-                buckets[api_key]["current_size"] = new_size_after_leak
-
-            # Update the time for the bucket.
-            buckets[api_key]["last_updated_time"] = current_time
-            
-            # Store the result in the nested structure your code expects.
-            minute = event['timestamp'].strftime('%M')
-            api_map[api_key][minute].append(event_output)
-               
+        for epoch, timestamp, minute, api_key, request_id, size in self._parse_log(request_logs):
+            accepted = limiter.check(api_key, size, epoch)
+            api_map[api_key][minute].append({
+                "request_id": request_id,
+                "size": size,
+                "timestamp": timestamp,
+                "status": "ACCEPTED" if accepted else "REJECTED"
+            })
         return api_map
     
     def get_number_of_requests_per_api(self, request_logs: str, leak_rate_per_second: int, bucket_capacity: int) -> dict:
@@ -118,8 +172,146 @@ class LeakyBucket:
                          
     def  get_summary(self, request_logs: str, leak_rate_per_second: int, bucket_capacity: int) -> dict:
         api_map = self.parse_events(request_logs, leak_rate_per_second, bucket_capacity)   
-        return api_map 
-        
+        summary = {}
+        for api_key, minutes in api_map.items():
+            statuses = [event["status"] for events in minutes.values() for event in events]
+            accepted = statuses.count("ACCEPTED")
+            summary[api_key] = {"total_requests": len(statuses), "accepted": accepted, "rejected": len(statuses) - accepted}
+        return summary
+
+
+class LeakyBucketSweep:
+    """
+    Offline replay of one request log under a grid of (capacity, leak_rate)
+    settings, for capacity planning. The log is parsed once into NumPy arrays
+    grouped by api_key. Buckets of different keys are independent, so step t
+    advances the t-th request of every key that has one, for every config at
+    once: the state is a (keys x configs) level matrix. Once only a few keys
+    still have requests, as with one hot key in long-tailed traffic, each is
+    finished on its own so the cost tracks total requests, not keys x steps.
+    Decisions use the same float64 operations as LeakyBucketLimiter, so
+    counts match `get_summary`.
+    """
+
+    def __init__(self, request_logs: str):
+        if np is None:
+            raise ImportError("LeakyBucketSweep requires numpy")
+        events = LeakyBucket()._parse_log(request_logs)
+        key_index = {}
+        keys = np.array([key_index.setdefault(event[3], len(key_index)) for event in events], dtype=np.int64)
+        self.api_keys = list(key_index)
+        self.total_requests = np.bincount(keys, minlength=len(self.api_keys))
+
+        # Stable sort keeps each key's requests in time order
+        order = np.argsort(keys, kind="stable")
+        self.epochs = np.array([event[0] for event in events], dtype=np.float64)[order]
+        self.sizes = np.array([event[5] for event in events], dtype=np.float64)[order]
+        starts = np.concatenate(([0], np.cumsum(self.total_requests)[:-1])).astype(np.int64)
+
+        # Busiest keys first, so the keys still active at step t are a prefix
+        self.key_rank = np.argsort(-self.total_requests, kind="stable")
+        self.ranked_starts = starts[self.key_rank]
+        self.ranked_counts = self.total_requests[self.key_rank]
+
+    # Below this many active keys, a (keys x configs) round per request costs
+    # more than finishing each remaining key on its own, over the configs
+    TAIL_KEYS = 8
+    # Up to this many configs, a plain-float loop per config beats NumPy call overhead
+    SCALAR_CONFIGS = 8
+
+    def counts(self, capacities: list, leak_rates: list) -> tuple:
+        """
+        Returns (grid, accepted): the (capacity, leak_rate) pairs, and the
+        number of accepted requests as a (keys x configs) array in `api_keys`
+        order. This skips building per-config summary dicts.
+        """
+        grid = [(capacity, leak_rate) for capacity in capacities for leak_rate in leak_rates]
+        capacity = np.array([config[0] for config in grid], dtype=np.float64)
+        leak_rate = np.array([config[1] for config in grid], dtype=np.float64)
+        n_keys = len(self.api_keys)
+
+        level = np.zeros((n_keys, len(grid)))
+        last = np.zeros(n_keys)
+        accepted = np.zeros((n_keys, len(grid)), dtype=np.int64)
+        max_requests = int(self.ranked_counts[0]) if n_keys else 0
+        # Keys with more than `step` requests, for every step at once
+        active_keys = np.searchsorted(-self.ranked_counts, -np.arange(max_requests), side="left")
+        step = 0
+        while step < max_requests and active_keys[step] > self.TAIL_KEYS:
+            active = int(active_keys[step])
+            index = self.ranked_starts[:active] + step
+            now = self.epochs[index]
+            size = self.sizes[index]
+            if step:
+                elapsed = np.maximum(now - last[:active], 0.0)
+                level[:active] = np.maximum(0.0, level[:active] - elapsed[:, None] * leak_rate)
+            fits = level[:active] + size[:, None] <= capacity
+            level[:active] += np.where(fits, size[:, None], 0.0)
+            accepted[:active] += fits
+            last[:active] = now
+            step += 1
+
+        if step < max_requests:
+            for rank in range(int(active_keys[step])):
+                self._replay_tail(rank, step, level, last, accepted, capacity, leak_rate)
+        # Back from busiest-first rank order to first-seen key order
+        accepted_by_key = np.empty_like(accepted)
+        accepted_by_key[self.key_rank] = accepted
+        return grid, accepted_by_key
+
+    def run(self, capacities: list, leak_rates: list) -> list:
+        """Evaluates every (capacity, leak_rate) pair; returns one summary per config."""
+        grid, accepted_by_key = self.counts(capacities, leak_rates)
+        totals = self.total_requests.tolist()
+        results = []
+        for (config_capacity, config_leak_rate), config_accepted in zip(grid, accepted_by_key.T.tolist()):
+            summary = {
+                api_key: {"total_requests": total, "accepted": key_accepted, "rejected": total - key_accepted}
+                for api_key, total, key_accepted in zip(self.api_keys, totals, config_accepted)
+            }
+            results.append({"bucket_capacity": config_capacity, "leak_rate_per_second": config_leak_rate, "summary": summary})
+        return results
+
+    def _replay_tail(self, rank: int, step: int, level, last, accepted, capacity, leak_rate) -> None:
+        """Finishes one key's requests from `step` on, one request at a time, vectorized over configs."""
+        start = int(self.ranked_starts[rank])
+        end = start + int(self.ranked_counts[rank])
+        if len(capacity) <= self.SCALAR_CONFIGS:
+            self._replay_tail_scalar(rank, step, start, end, level, last, accepted, capacity, leak_rate)
+            return
+        bucket_level = level[rank].copy()
+        key_accepted = accepted[rank].copy()
+        leaked = np.empty_like(bucket_level)
+        fits = np.empty(len(bucket_level), dtype=bool)
+        previous = float(last[rank])
+        for i, (now, size) in enumerate(zip(self.epochs[start + step:end].tolist(), self.sizes[start + step:end].tolist())):
+            if step or i:
+                np.multiply(leak_rate, max(now - previous, 0.0), out=leaked)
+                np.subtract(bucket_level, leaked, out=bucket_level)
+                np.maximum(bucket_level, 0.0, out=bucket_level)
+            np.less_equal(bucket_level + size, capacity, out=fits)
+            np.add(bucket_level, size, out=bucket_level, where=fits)
+            key_accepted += fits
+            previous = now
+        accepted[rank] = key_accepted
+
+    def _replay_tail_scalar(self, rank: int, step: int, start: int, end: int, level, last, accepted,
+                            capacity, leak_rate) -> None:
+        epochs = self.epochs[start + step:end].tolist()
+        sizes = self.sizes[start + step:end].tolist()
+        for config, (config_capacity, config_leak_rate) in enumerate(zip(capacity.tolist(), leak_rate.tolist())):
+            bucket_level = float(level[rank, config])
+            previous = float(last[rank])
+            key_accepted = 0
+            for i, (now, size) in enumerate(zip(epochs, sizes)):
+                if step or i:
+                    bucket_level = max(0.0, bucket_level - max(now - previous, 0.0) * config_leak_rate)
+                if bucket_level + size <= config_capacity:
+                    bucket_level += size
+                    key_accepted += 1
+                previous = now
+            accepted[rank, config] += key_accepted
+
 if __name__ == "__main__":
     requests_log = "2025-01-01T10:00:00Z;key_A;req_1;10~2025-01-01T10:00:00Z;key_A;req_2;15~2025-01-01T10:00:01Z;key_A;req_3;20"
     bucket_capacity = 30
@@ -142,4 +334,15 @@ if __name__ == "__main__":
     
     print(leaky_bucket.get_summary(requests_log, leak_rate_per_second, bucket_capacity))    
               
-        
\ No newline at end of file
+        
+
+    print("online limiter")
+    limiter = LeakyBucketLimiter(bucket_capacity, leak_rate_per_second, idle_ttl=3600)
+    # Expected: True, True, False (20 > 30 - 25 + 10), then True after a full drain
+    for size, now in ((10, 0.0), (15, 0.0), (20, 1.0), (20, 10.0)):
+        print(limiter.check("key_A", size, now))
+
+    if np is not None:
+        print("capacity sweep")
+        for result in LeakyBucketSweep(requests_log).run([25, 30, 45], [5, 10]):
+            print(result)
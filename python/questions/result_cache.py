@@ -0,0 +1,103 @@
+"""
+Shared result cache for the log processors in this folder.
+
+Several processors (`ConnectFeeCalculator` in q23.py, `AuthorizationService` in
+card_lifecycle.py) memoize only the last log they saw by comparing the whole
+log string with `self._cached_log == log`. That is a full string compare on
+every call, and the memo thrashes as soon as two logs alternate.
+
+`ResultCache` keeps many results instead:
+- Keys are a fixed-size digest of (namespace, log), so the cache never holds on
+  to the multi-megabyte logs themselves.
+- Entries live in a bounded LRU that tracks an estimate of each result's size
+  and evicts least recently used entries past `max_entries` or `max_bytes`.
+- Hit/miss/eviction counters are exposed through `stats()`.
+- `invalidate` drops one log's result, or everything.
+
+A processor opts in by being constructed with `result_cache=ResultCache()`.
+One cache can be shared by several processors; the namespace keeps their
+results apart.
+"""
+import hashlib
+import sys
+from collections import OrderedDict
+
+
+class ResultCache:
+    def __init__(self, max_entries: int = 128, max_bytes: int = 64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # digest -> (result, size)
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key(namespace: str, log: str) -> bytes:
+        digest = hashlib.blake2b(namespace.encode(), digest_size=16)
+        digest.update(b"\0")
+        digest.update(log.encode())
+        return digest.digest()
+
+    @staticmethod
+    def estimate_size(obj) -> int:
+        """Approximate deep size in bytes of a result built from dicts, lists and scalars."""
+        seen = set()
+        stack = [obj]
+        total = 0
+        while stack:
+            item = stack.pop()
+            if id(item) in seen:
+                continue
+            seen.add(id(item))
+            total += sys.getsizeof(item)
+            if isinstance(item, dict):
+                stack.extend(item.keys())
+                stack.extend(item.values())
+            elif isinstance(item, (list, tuple, set, frozenset)):
+                stack.extend(item)
+        return total
+
+    def get_or_compute(self, namespace: str, log: str, compute):
+        """Returns the cached result for `log`, or computes, stores and returns it."""
+        key = self.key(namespace, log)
+        if key in self._entries:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return self._entries[key][0]
+
+        self.misses += 1
+        result = compute(log)
+        self._store(key, result)
+        return result
+
+    def _store(self, key: bytes, result) -> None:
+        size = self.estimate_size(result)
+        if size > self.max_bytes:
+            return  # Would evict everything else and still not fit
+        self._entries[key] = (result, size)
+        self._bytes += size
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            _, (_, evicted_size) = self._entries.popitem(last=False)
+            self._bytes -= evicted_size
+            self.evictions += 1
+
+    def invalidate(self, namespace: str = None, log: str = None) -> None:
+        """Drops the result for (namespace, log), or every entry when no log is given."""
+        if log is None:
+            self._entries.clear()
+            self._bytes = 0
+            return
+        entry = self._entries.pop(self.key(namespace, log), None)
+        if entry is not None:
+            self._bytes -= entry[1]
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self._entries),
+            "bytes": self._bytes
+        }